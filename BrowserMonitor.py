@@ -1,158 +1,142 @@
+import sys
+
+# Headless daemon mode: hand off before any GUI or audio module is imported
+if __name__ == "__main__" and "--daemon" in sys.argv[1:]:
+    from monitor_daemon import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != "--daemon"]))
+
 import time
 import pygetwindow as gw
 import mss
 import tkinter as tk
 from tkinter import messagebox, Toplevel
-from PIL import Image, ImageChops, ImageStat, ImageDraw, ImageTk
+from PIL import ImageDraw, ImageTk
 import pygame
 import threading
-import json
+import multiprocessing
 import os
-import requests
-from datetime import datetime
 import queue
 from tkinter import ttk
-
-# Initialize pygame mixer
-pygame.mixer.init()
+from capture import CaptureSession, window_geometry, screenshot_to_image
+from clips import CLIP_GIF, CLIP_FORMATS, ClipRecorder
+from datetime import datetime
+from diff_engine import (TILE_SIZE, MIN_TILE_SIZE, CHANGE_THRESHOLD, COMPARE_RGB, COMPARE_MODES, FramePreparer,
+                         detect_changes, change_regions, describe_regions, render_overlay)
+from fingerprint import FramePrefilter
+from history import HistoryRecorder
+from masks import IgnoreMask, learn_noise_rects, window_to_frame
+from metrics import metrics, MetricsServer
+from noise_model import TileNoiseModel
+from notifications import AlertCooldown, NotificationDispatcher, event_overlay
+from polling import MAX_POLL_INTERVAL, AdaptivePoller
+from process_pool import new_generation
+from scheduler import WatchTarget, MonitorScheduler
+from config_store import store
+from remote_control import RemoteControl, parse_command
+from telegram_client import (TELEGRAM_TIMEOUT, TelegramCommandListener, load_telegram_config, telegram_request,
+                             send_telegram_message, send_change_notification)
 
 # Global variables
 selected_window = None
 monitoring = False
 last_screenshot = None
 selected_area = None
+ignore_regions = []  # Window-relative rectangles excluded from comparison
 selection_window = None
 show_monitored_area = False
-command_queue = queue.Queue()  # For thread-safe command handling
-
-def load_telegram_config():
-    """Load Telegram configuration from a JSON file."""
+gui_calls = queue.Queue()  # Calls worker threads hand over to the GUI thread
+# Virtual event that wakes the GUI thread up to run the queued calls
+GUI_CALL_EVENT = "<<GuiCall>>"
+# Telegram commands about the main monitor, run on the GUI thread; the rest control watch targets
+MONITORING_COMMANDS = {"/start_monitoring", "/stop_monitoring", "/status"}
+telegram_listener = None  # Telegram command listener, created once Telegram is configured
+scheduler = None  # Multi-target scheduler, created with the main window
+remote_control = None  # Telegram commands for the watch targets, created with the scheduler
+notifier = None  # Notification dispatcher, created with the main window
+history = HistoryRecorder()  # On-disk change history, used when enabled in the alert settings
+change_overlay_window = None  # Latest overlay shown in continuous mode
+monitor_settings_changed = threading.Event()  # Set when the alert settings change during a monitoring run
+
+def call_in_gui_thread(function, *args):
+    """Run function(*args) on the GUI thread; safe to call from any thread.
+
+    Tk must only be called from the thread running the main loop, so the
+    call is queued and a virtual event wakes the main loop up to run it;
+    nothing polls while the queue is empty.
+    """
+    gui_calls.put((function, args))
     try:
-        with open('telegram_config.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
+        root.event_generate(GUI_CALL_EVENT, when="tail")
+    except (tk.TclError, RuntimeError) as e:
+        print(f"Error waking up the GUI thread: {e}")
 
-def send_telegram_message(message):
-    """Send a simple text message via Telegram."""
-    config = load_telegram_config()
-    if not config:
-        return
-
-    try:
-        bot_token = config['bot_token']
-        chat_id = config['chat_id']
-
-        response = requests.post(
-            f"https://api.telegram.org/bot{bot_token}/sendMessage",
-            data={
-                "chat_id": chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-        )
-        if response.status_code != 200:
-            print(f"Failed to send Telegram message: {response.text}")
-    except Exception as e:
-        print(f"Error sending Telegram message: {e}")
+def run_gui_calls(event=None):
+    """Run the calls queued for the GUI thread (bound to GUI_CALL_EVENT)."""
+    while True:
+        try:
+            function, args = gui_calls.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            function(*args)
+        except Exception as e:
+            print(f"Error running {function.__name__} on the GUI thread: {e}")
 
-def check_telegram_commands():
-    """Check for incoming Telegram commands."""
-    global monitoring
+def queue_telegram_command(command):
+    """Route a Telegram command (runs on the listener thread).
 
-    config = load_telegram_config()
-    if not config:
+    Target commands are answered right here, off the GUI thread; the
+    monitoring commands are handed to the GUI thread.
+    """
+    if parse_command(command)[0] not in MONITORING_COMMANDS:
+        remote_control.handle(command)
         return
+    call_in_gui_thread(process_telegram_command, command)
 
-    try:
-        bot_token = config['bot_token']
-        last_update_id = 0
-
-        while hasattr(check_telegram_commands, 'running') and check_telegram_commands.running:
-            try:
-                # Get updates from Telegram
-                response = requests.get(
-                    f"https://api.telegram.org/bot{bot_token}/getUpdates",
-                    params={"offset": last_update_id + 1, "timeout": 30}
-                )
-
-                if response.status_code == 200:
-                    updates = response.json()
-
-                    if updates.get("ok") and updates.get("result"):
-                        for update in updates["result"]:
-                            last_update_id = update["update_id"]
-
-                            if "message" in update and "text" in update["message"]:
-                                command = update["message"]["text"].lower()
-
-                                # Add command to queue for main thread processing
-                                command_queue.put(command)
+def reply_telegram(message):
+    """Answer a command without blocking the GUI thread on the network."""
+    threading.Thread(target=send_telegram_message, args=(message,), daemon=True).start()
 
-            except Exception as e:
-                print(f"Error checking Telegram commands: {e}")
-
-            time.sleep(1)
-
-    except Exception as e:
-        print(f"Error in command checking loop: {e}")
-
-def process_telegram_commands():
-    """Process any pending Telegram commands from the main thread."""
+def process_telegram_command(command):
+    """Process a monitoring command on the main thread."""
     try:
-        while not command_queue.empty():
-            command = command_queue.get_nowait()
-
-            if command == "/start_monitoring":
-                if not monitoring:
-                    root.after(0, start_monitoring)
-                    send_telegram_message("Monitoring started.")
-                else:
-                    send_telegram_message("Monitoring is already active.")
-
-            elif command == "/stop_monitoring":
-                if monitoring:
-                    root.after(0, stop_monitoring)
-                    send_telegram_message("Monitoring stopped.")
-                else:
-                    send_telegram_message("Monitoring is already stopped.")
+        command = parse_command(command)[0]
+        if command == "/start_monitoring":
+            if not monitoring:
+                start_monitoring()
+                reply_telegram("Monitoring started.")
+            else:
+                reply_telegram("Monitoring is already active.")
 
-            elif command == "/status":
-                status = "active" if monitoring else "stopped"
-                send_telegram_message(f"Monitoring is currently {status}.")
+        elif command == "/stop_monitoring":
+            if monitoring:
+                stop_monitoring()
+                reply_telegram("Monitoring stopped.")
+            else:
+                reply_telegram("Monitoring is already stopped.")
 
-            elif command == "/help":
-                help_text = """
-Available commands:
-/start_monitoring - Start monitoring
-/stop_monitoring - Stop monitoring
-/status - Check monitoring status
-/help - Show this help message
-"""
-                send_telegram_message(help_text)
+        elif command == "/status":
+            status = "active" if monitoring else "stopped"
+            reply_telegram(f"Monitoring is currently {status}.")
     except Exception as e:
-        print(f"Error processing Telegram commands: {e}")
-    finally:
-        # Schedule next check
-        root.after(1000, process_telegram_commands)
+        print(f"Error processing Telegram command: {e}")
 
 def start_telegram_command_checker():
-    """Start the Telegram command checking thread."""
-    check_telegram_commands.running = True
-    thread = threading.Thread(target=check_telegram_commands, daemon=True)
-    thread.start()
-    # Start command processing in main thread
-    root.after(1000, process_telegram_commands)
+    """Start listening for Telegram commands (does nothing if already listening)."""
+    global telegram_listener
+    if telegram_listener is None:
+        telegram_listener = TelegramCommandListener(queue_telegram_command)
+    telegram_listener.start()
 
 def stop_telegram_command_checker():
-    """Stop the Telegram command checking thread."""
-    if hasattr(check_telegram_commands, 'running'):
-        check_telegram_commands.running = False
+    """Stop the Telegram command listener."""
+    if telegram_listener is not None:
+        telegram_listener.stop()
 def setup_telegram_config():
     """Create a window to setup Telegram configuration."""
     config_window = Toplevel()
     config_window.title("Telegram Configuration")
-    config_window.geometry("500x450")
+    config_window.geometry("500x560")
 
     # Create main frame with padding
     main_frame = tk.Frame(config_window, padx=20, pady=20)
@@ -171,6 +155,11 @@ def setup_telegram_config():
     /start_monitoring - Start monitoring
     /stop_monitoring - Stop monitoring
     /status - Check monitoring status
+    /targets - List watch targets
+    /pause, /resume <target> - Pause or resume a target
+    /snapshot <target> - Screenshot a target
+    /interval, /threshold <target> <value> - Tune a target
+    /stats [target] - Per-target statistics
     /help - Show command list
     """
     tk.Label(main_frame, text=instructions, justify=tk.LEFT, wraplength=450).pack(pady=(0,20))
@@ -235,8 +224,7 @@ def setup_telegram_config():
             return
 
         try:
-            with open('telegram_config.json', 'w') as f:
-                json.dump(config, f)
+            store.save('telegram', config)
 
             # Test the configuration
             test_message = "Configuration test - If you receive this, your setup is working correctly!"
@@ -274,7 +262,7 @@ def view_telegram_config():
 
     config_window = Toplevel()
     config_window.title("Current Telegram Configuration")
-    config_window.geometry("400x350")  # Made taller for command list
+    config_window.geometry("400x450")  # Made taller for command list
 
     frame = tk.Frame(config_window, padx=20, pady=20)
     frame.pack(fill=tk.BOTH, expand=True)
@@ -299,6 +287,11 @@ def view_telegram_config():
     /start_monitoring - Start monitoring
     /stop_monitoring - Stop monitoring
     /status - Check monitoring status
+    /targets - List watch targets
+    /pause, /resume <target> - Pause or resume a target
+    /snapshot <target> - Screenshot a target
+    /interval, /threshold <target> <value> - Tune a target
+    /stats [target] - Per-target statistics
     /help - Show command list
     """
     tk.Label(frame, text=commands, justify=tk.LEFT).pack(anchor='w', padx=20)
@@ -306,8 +299,7 @@ def view_telegram_config():
     def remove_configuration():
         if messagebox.askyesno("Confirm", "Are you sure you want to remove the current configuration?"):
             try:
-                if os.path.exists('telegram_config.json'):
-                    os.remove('telegram_config.json')
+                store.remove('telegram')
                 messagebox.showinfo("Success", "Configuration removed successfully!")
                 config_window.destroy()
             except Exception as e:
@@ -340,63 +332,23 @@ def view_telegram_config():
               cursor="hand2",
               padx=20, 
               pady=5).pack(pady=10)
-def send_telegram_notification(overlay_image=None):
-    """Send Telegram notification with screenshot when changes are detected."""
+def send_telegram_notification(event, timeout):
+    """Notification channel: send the change event's screenshot via Telegram."""
+    if not store.get('alerts')['telegram_alerts']:
+        return
+
     config = load_telegram_config()
     if not config:
-        messagebox.showerror("Error", "Telegram configuration not found!")
+        print("Telegram configuration not found, skipping notification")
         return
 
-    bot_token = config['bot_token']
-    chat_id = config['chat_id']
-    base_url = f"https://api.telegram.org/bot{bot_token}"
+    send_change_notification(config, event_overlay(event), event.get("target"), timeout=timeout,
+                             regions=event.get("regions"))
+    print("Telegram notification sent successfully!")
 
-    try:
-        # Get current time
-        current_time = datetime.now().strftime("%I:%M:%S %p")
-
-        # Send text message with timestamp
-        message_text = f"🔔 Change detected in monitored browser window!\n⏰ Time: {current_time}"
-        response = requests.post(
-            f"{base_url}/sendMessage",
-            data={
-                "chat_id": chat_id,
-                "text": message_text,
-                "parse_mode": "HTML"
-            }
-        )
-
-        # If we have an image, send it
-        if overlay_image:
-            # Save the image temporarily with unique timestamp
-            temp_image_path = f"temp_screenshot_{int(time.time())}.png"
-            overlay_image.save(temp_image_path)
-
-            try:
-                # Send the image
-                with open(temp_image_path, 'rb') as image_file:
-                    response = requests.post(
-                        f"{base_url}/sendPhoto",
-                        data={
-                            "chat_id": chat_id,
-                            "caption": "Screenshot showing detected changes (highlighted in red)"
-                        },
-                        files={
-                            "photo": image_file
-                        }
-                    )
-            finally:
-                # Clean up temporary file
-                try:
-                    if os.path.exists(temp_image_path):
-                        os.remove(temp_image_path)
-                except Exception as e:
-                    print(f"Error removing temporary file: {e}")
-
-        print("Telegram notification sent successfully!")
-    except Exception as e:
-        print(f"Error sending Telegram notification: {e}")
-        messagebox.showerror("Error", f"Failed to send Telegram notification: {str(e)}")
+def notification_failed(channel, event, error):
+    """Report a notification that failed after all retries."""
+    call_in_gui_thread(messagebox.showerror, "Error", f"Failed to send {channel} notification: {str(error)}")
 
 def test_telegram_configuration():
     """Test Telegram configuration by sending a test message."""
@@ -406,8 +358,6 @@ def test_telegram_configuration():
         return
 
     try:
-        bot_token = config['bot_token']
-        chat_id = config['chat_id']
         message = """
 🔧 Test message from Browser Monitor
 
@@ -417,17 +367,19 @@ Available commands:
 • /start_monitoring - Start monitoring
 • /stop_monitoring - Stop monitoring
 • /status - Check monitoring status
+• /targets - List watch targets
+• /pause, /resume &lt;target&gt; - Pause or resume a target
+• /snapshot &lt;target&gt; - Screenshot a target
+• /interval, /threshold &lt;target&gt; &lt;value&gt; - Tune a target
+• /stats [target] - Per-target statistics
 • /help - Show this help message
         """
 
-        response = requests.post(
-            f"https://api.telegram.org/bot{bot_token}/sendMessage",
-            data={
-                "chat_id": chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-        )
+        response = telegram_request(config, "sendMessage", data={
+            "chat_id": config['chat_id'],
+            "text": message,
+            "parse_mode": "HTML"
+        })
 
         if response.status_code == 200:
             messagebox.showinfo("Success", "Test message sent successfully!\nPlease check your Telegram for the message.")
@@ -449,6 +401,11 @@ def play_sound():
         except Exception as e:
             print(f"Error with os.system sound: {e}")
 
+def play_alert_sound(event, timeout):
+    """Notification channel: play the alert sound if enabled in the alert settings."""
+    if store.get('alerts')['notification_sound']:
+        play_sound()
+
 def list_browser_windows():
     """List browser windows available for monitoring."""
     windows = gw.getWindowsWithTitle("")
@@ -492,9 +449,10 @@ def select_window():
         btn.pack(fill=tk.X, padx=5, pady=2, ipadx=5)
 def set_selected_window(window, selection_window):
     """Set the selected window for monitoring."""
-    global selected_window, selected_area
+    global selected_window, selected_area, ignore_regions
     selected_window = window
     selected_area = None  # Reset selected area when new window is selected
+    ignore_regions = []
     update_status_indicator(False)
     selected_window_label.config(
         text=f"Selected Browser Window:\n{selected_window.title}",
@@ -506,7 +464,11 @@ def set_selected_window(window, selection_window):
     selection_window.destroy()
 
 def capture_window(window):
-    """Capture a screenshot of the selected window, working even with display off."""
+    """Capture a one-off screenshot of the selected window, working even with display off.
+
+    The monitoring loop uses a CaptureSession instead so it does not reopen
+    the display connection on every frame.
+    """
     if not window:
         return None
     try:
@@ -514,10 +476,7 @@ def capture_window(window):
         with mss.mss() as sct:
             try:
                 # Get window coordinates
-                left = max(0, window.left)
-                top = max(0, window.top)
-                width = window.width
-                height = window.height
+                left, top, width, height = window_geometry(window)
 
                 # Create monitor dict for capture
                 monitor = {
@@ -529,8 +488,7 @@ def capture_window(window):
 
                 # Capture without trying to activate window
                 screenshot = sct.grab(monitor)
-                img = Image.frombytes("RGB", (screenshot.width, screenshot.height), screenshot.rgb)
-                return img
+                return screenshot_to_image(screenshot)
             except Exception as e:
                 print(f"Screenshot capture error: {e}")
                 return None
@@ -538,121 +496,226 @@ def capture_window(window):
         print(f"Capture error: {e}")
         return None
 
-def divide_image_into_tiles(image, tile_size):
-    """Divide the screenshot into smaller tiles (regions) for more granular comparison."""
-    tiles = []
-    width, height = image.size
-    for y in range(0, height, tile_size):
-        for x in range(0, width, tile_size):
-            box = (x, y, min(x + tile_size, width), min(y + tile_size, height))
-            tiles.append((box, image.crop(box)))
-    return tiles
-
-def calculate_image_difference(img1, img2):
-    """Calculate the visual difference between two images."""
-    try:
-        diff = ImageChops.difference(img1, img2)
-        stat = ImageStat.Stat(diff)
-        diff_mean = sum(stat.mean) / len(stat.mean)  # Average difference in pixel values
-        return diff_mean
-    except Exception as e:
-        print(f"Error calculating image difference: {e}")
-        return 0
-
 def monitor_window():
     """Continuously monitor the selected window or area for visual changes."""
     global monitoring, last_screenshot
 
     if not selected_window:
-        messagebox.showerror("Error", "No window selected!")
+        call_in_gui_thread(messagebox.showerror, "Error", "No window selected!")
         return
 
-    # Capture the initial screenshot for comparison
-    full_screenshot = capture_window(selected_window)
-    if full_screenshot is None:
-        messagebox.showerror("Error", "Could not capture the selected window.")
-        return
-
-    # If area is selected, crop the screenshot
-    if selected_area:
-        last_screenshot = full_screenshot.crop(selected_area)
-    else:
-        last_screenshot = full_screenshot
+    def load_settings():
+        # Comparison and clip objects follow the alert settings; rebuilt when they change mid-run
+        settings = store.get('alerts')
+        preparer = FramePreparer(settings['compare_mode'])
+        tile_size = preparer.tile_size(TILE_SIZE)
+        prefilter = FramePrefilter(tile_size, settings['perceptual_prefilter'])
+        prefilter.identical(last_frame)
+        noise_model = TileNoiseModel(tile_size) if settings['adaptive_thresholds'] else None
+        clips = ClipRecorder("monitor", settings['clip_frames'], settings['clip_frames'],
+                             clip_format=settings['clip_format'])
+        return (preparer, tile_size, preparer.tile_size(MIN_TILE_SIZE), prefilter,
+                IgnoreMask(preparer.to_prepared(window_to_frame(ignore_regions, selected_area))), noise_model, clips)
+
+    # Keep one capture session open for the whole monitoring run.
+    # Only the selected area (if any) is grabbed on each tick
+    with CaptureSession(selected_window, selected_area) as session:
+        # Frames are views into the session's two capture buffers; a PIL
+        # image is only built when an overlay has to be drawn
+        last_frame = session.grab_frame()
+        if last_frame is None:
+            call_in_gui_thread(messagebox.showerror, "Error", "Could not capture the selected window.")
+            return
+        last_screenshot = last_frame
+        last_generation = new_generation()  # Identifies last_frame's pixels to the diff pool
 
-    consecutive_failures = 0
-    MAX_FAILURES = 3
-    notification_sent = False  # Flag to prevent multiple notifications
+        # Frames are compared in the configured mode (RGB, luma or downsampled luma), and
+        # recent frames are kept for a clip around each alert when enabled
+        monitor_settings_changed.clear()
+        preparer, tile_size, min_tile_size, prefilter, ignore_mask, noise_model, clips = load_settings()
+        diff_pool = scheduler.diff_pool  # Worker processes, if enabled in the alert settings
 
-    while monitoring:
         try:
-            time.sleep(1)
+            consecutive_failures = 0
+            MAX_FAILURES = 3
+            notification_sent = False  # Flag to prevent multiple notifications
 
-            if not monitoring:  # Check monitoring status
-                break
+            # Back off on a static page, snap back to 1s after a change
+            monitor_poller = AdaptivePoller(1.0, MAX_POLL_INTERVAL)
+            alert_cooldown = AlertCooldown()
+            monitor_poller.tick()
 
-            current_full_screenshot = capture_window(selected_window)
-            if current_full_screenshot is None:
-                consecutive_failures += 1
-                if consecutive_failures >= MAX_FAILURES:
-                    print("Multiple capture failures, but continuing to monitor...")
-                continue
-            else:
-                consecutive_failures = 0
-
-            # If area is selected, crop the current screenshot
-            if selected_area:
-                current_screenshot = current_full_screenshot.crop(selected_area)
-            else:
-                current_screenshot = current_full_screenshot
-
-            # Only proceed if not already notified
-            if not notification_sent:
-                # Divide the images into tiles for comparison
-                tile_size = 100
-                last_tiles = divide_image_into_tiles(last_screenshot, tile_size)
-                current_tiles = divide_image_into_tiles(current_screenshot, tile_size)
-
-                overlay_image = current_screenshot.copy()
-                draw = ImageDraw.Draw(overlay_image)
-                significant_change_detected = False
-
-                for (box1, last_tile), (box2, current_tile) in zip(last_tiles, current_tiles):
-                    if not monitoring:  # Check monitoring status during comparison
-                        return
-                    diff = calculate_image_difference(last_tile, current_tile)
-                    CHANGE_THRESHOLD = 10
-                    if diff > CHANGE_THRESHOLD:
-                        significant_change_detected = True
-                        draw.rectangle(box1, outline="red", width=3)
-
-                if significant_change_detected:
-                    # Set notification flag before sending
-                    notification_sent = True
-
-                    # Prepare final overlay image
-                    final_overlay = None
-                    if selected_area:
-                        final_overlay = current_full_screenshot.copy()
-                        draw = ImageDraw.Draw(final_overlay)
-                        draw.rectangle(selected_area, outline="blue", width=2)
-                        final_overlay.paste(overlay_image, (selected_area[0], selected_area[1]))
+            while monitoring:
+                try:
+                    # Sleep until the next deadline in short steps so Stop stays responsive
+                    while monitoring and time.monotonic() < monitor_poller.deadline:
+                        time.sleep(min(0.25, max(0, monitor_poller.deadline - time.monotonic())))
+
+                    if not monitoring:  # Check monitoring status
+                        break
+
+                    monitor_poller.tick()
+                    tick_started = time.perf_counter()
+                    current_frame = session.grab_frame()
+                    if current_frame is None:
+                        consecutive_failures += 1
+                        if consecutive_failures >= MAX_FAILURES:
+                            print("Multiple capture failures, but continuing to monitor...")
+                        continue
                     else:
-                        final_overlay = overlay_image
+                        consecutive_failures = 0
+                    current_generation = new_generation()
+                    if monitor_settings_changed.is_set():
+                        monitor_settings_changed.clear()
+                        clips.close()
+                        preparer, tile_size, min_tile_size, prefilter, ignore_mask, noise_model, clips = load_settings()
+                        # The baseline is prepared differently now; the pool's copy of it is stale
+                        last_generation = new_generation()
+                    clips.add(current_frame)
+
+                    # Only proceed if not already notified
+                    if not notification_sent:
+                        # Alert only once the configured share of the area has changed
+                        diff_started = time.perf_counter()
+                        # Identical grabs are skipped before the frame is converted for comparison
+                        candidates = None
+                        if prefilter.identical(current_frame):
+                            preparer.reuse(last_frame, current_frame)
+                        else:
+                            baseline = preparer.prepare(last_frame)
+                            prepared = preparer.prepare(current_frame)
+                            candidates = prefilter.candidates(prepared)
+                        min_change_percent = store.get('alerts')['min_change_percent']
+                        if candidates is None:
+                            if noise_model is not None:
+                                noise_model.skip()
+                            changed_boxes, change_percent = [], 0.0
+                        elif diff_pool is not None:
+                            # Stripes of the frame are compared in parallel worker processes
+                            band = (noise_model.band() if noise_model is not None and not noise_model.warming_up
+                                    else None)
+                            changed_boxes, change_percent, scores = diff_pool.detect(
+                                "monitor", baseline, prepared, tile_size, CHANGE_THRESHOLD, min_change_percent,
+                                candidates, min_tile_size, ignore_mask.rects, band, noise_model is not None,
+                                (last_generation, current_generation))
+                            if scores is not None:
+                                noise_model.observe(scores)
+                        else:
+                            if noise_model is not None:
+                                # Tiles must also leave their own learned noise band
+                                firing = noise_model.check(baseline, prepared)
+                                if firing is not None:
+                                    candidates = candidates & firing
+                            changed_boxes, change_percent = detect_changes(baseline, prepared,
+                                                                           tile_size, CHANGE_THRESHOLD,
+                                                                           min_change_percent, candidates,
+                                                                           min_tile_size, ignore_mask)
+                        if not monitoring:  # Check monitoring status after comparison
+                            return
+                        metrics.observe("stage_seconds", time.perf_counter() - diff_started,
+                                        target="monitor", stage="diff")
+                        metrics.observe("tick_seconds", time.perf_counter() - tick_started, target="monitor")
+                        metrics.inc("ticks_total", target="monitor")
+                        monitor_poller.record(bool(changed_boxes))
+
+                        if changed_boxes:
+                            settings = store.get('alerts')
+                            continuous = settings['continuous_monitoring']
+                            if settings['history_enabled']:
+                                # Every change is recorded, including those inside the alert cooldown.
+                                # It is written later on the history thread, so the reused capture buffer is copied
+                                history.record_event({
+                                    "target": "monitor",
+                                    "frame": current_frame.copy(),
+                                    "time": datetime.now(),
+                                    "boxes": preparer.to_frame(changed_boxes, current_frame.shape[1],
+                                                               current_frame.shape[0]),
+                                    "percent": change_percent
+                                })
+
+                            # In continuous mode changes inside the cooldown only roll the baseline
+                            if continuous and not alert_cooldown.ready(settings['cooldown_period']):
+                                last_screenshot = last_frame = current_frame
+                                last_generation = current_generation
+                                continue
+
+                            # One rectangle per connected changed region rather than per cell
+                            regions = preparer.regions_to_frame(
+                                change_regions(baseline, prepared, changed_boxes, min_tile_size),
+                                current_frame.shape[1], current_frame.shape[0])
+                            print(f"Change detected: {describe_regions(regions)}")
+                            metrics.inc("changes_total", target="monitor")
+                            with metrics.timer("stage_seconds", target="monitor", stage="overlay"):
+                                overlay_image = render_overlay(current_frame, [region["box"] for region in regions])
+
+                            # Prepare final overlay image
+                            final_overlay = None
+                            full_screenshot = session.grab(full=True) if selected_area else None
+                            if full_screenshot is not None:
+                                # Full window is only grabbed now that a change has fired
+                                final_overlay = full_screenshot
+                                draw = ImageDraw.Draw(final_overlay)
+                                draw.rectangle(selected_area, outline="blue", width=2)
+                                final_overlay.paste(overlay_image, (selected_area[0], selected_area[1]))
+                            else:
+                                final_overlay = overlay_image
+
+                            clips.mark([region["box"] for region in regions])
+                            notifier.submit({"time": datetime.now(), "overlay": final_overlay, "regions": regions})
+
+                            if continuous:
+                                # Keep capturing; the overlay is shown without pausing detection
+                                if settings['desktop_notifications']:
+                                    call_in_gui_thread(show_change_overlay, final_overlay)
+                            else:
+                                # The overlay blocks this thread and monitoring restarts afterwards, so
+                                # the clip's post frames are grabbed and the clip saved before it opens
+                                for _ in range(clips.post):
+                                    time.sleep(monitor_poller.base_interval)
+                                    if not monitoring:
+                                        break
+                                    post_frame = session.grab_frame()
+                                    if post_frame is not None:
+                                        clips.add(post_frame)
+                                clips.close()
+
+                                # Set notification flag, stop monitoring and show the overlay
+                                notification_sent = True
+                                monitoring = False
+                                call_in_gui_thread(update_status_indicator, False)
+                                call_in_gui_thread(display_overlay, final_overlay)
+                                return  # Exit function completely
+
+                    if monitoring:  # Only update if still monitoring
+                        last_screenshot = last_frame = current_frame
+                        last_generation = current_generation
 
-                    # Stop monitoring and send notifications
-                    monitoring = False
-                    update_status_indicator(False)
-                    play_sound()
-                    send_telegram_notification(final_overlay)
-                    display_overlay(final_overlay)
-                    return  # Exit function completely
+                except Exception as e:
+                    print(f"Error in monitoring loop: {e}")
+                    time.sleep(1)
+        finally:
+            # Saves clips still waiting for frames
+            clips.close()
+def show_change_overlay(overlay_image):
+    """Show the latest change overlay without interrupting continuous monitoring."""
+    global change_overlay_window
+    if change_overlay_window is not None and change_overlay_window.winfo_exists():
+        change_overlay_window.destroy()
+
+    change_overlay_window = Toplevel()
+    change_overlay_window.title("Visual Changes Highlighted")
+    change_overlay_window.attributes("-topmost", True)
 
-            if monitoring:  # Only update if still monitoring
-                last_screenshot = current_screenshot
+    overlay_photo = ImageTk.PhotoImage(overlay_image)
+    overlay_label = tk.Label(change_overlay_window, image=overlay_photo)
+    overlay_label.image = overlay_photo
+    overlay_label.pack()
+
+    tk.Label(change_overlay_window,
+             text=f"Change detected at {datetime.now().strftime('%I:%M:%S %p')} - monitoring continues",
+             font=("Arial", 10),
+             bg="#f8f9fa").pack(fill='x', pady=5)
 
-        except Exception as e:
-            print(f"Error in monitoring loop: {e}")
-            time.sleep(1)
 def display_overlay(overlay_image):
     """Display the overlayed screenshot with highlighted changes and start auto-resume countdown."""
     root.deiconify()
@@ -793,9 +856,8 @@ def start_monitoring():
         monitoring = True
         update_status_indicator(True)
 
-        # Start command checker if not already running
-        if not hasattr(check_telegram_commands, 'running'):
-            start_telegram_command_checker()
+        # Start the command listener if not already running
+        start_telegram_command_checker()
 
         thread = threading.Thread(target=monitor_window, daemon=True)
         thread.start()
@@ -806,6 +868,184 @@ def stop_monitoring():
     monitoring = False
     update_status_indicator(False)
 
+def on_target_change(target, event):
+    """Handle a change reported by the multi-target scheduler (runs on a diff worker)."""
+    print(f"Change detected in {target.name} at {event['time'].strftime('%I:%M:%S %p')} "
+          f"({describe_regions(event['regions'])})")
+    if store.get('alerts')['history_enabled']:
+        history.record_event(event)
+    if target.cooldown.ready(store.get('alerts')['cooldown_period']):
+        notifier.submit(event)
+
+def add_watch_target():
+    """Add the selected window (and area) to the multi-target scheduler."""
+    if not selected_window:
+        messagebox.showerror("Error", "Please select a window first!")
+        return
+
+    target_window = tk.Toplevel(root)
+    target_window.title("Add Watch Target")
+    target_window.geometry("400x420")
+    target_window.configure(bg="#f8f9fa")
+
+    tk.Label(target_window, text="Add Watch Target", font=("Arial", 14, "bold"),
+            bg="#f8f9fa").pack(pady=10)
+
+    area_text = f"Area: {selected_area}" if selected_area else "Area: whole window"
+    tk.Label(target_window, text=area_text, bg="#f8f9fa").pack(pady=5)
+
+    fields = {}
+    for label, key, default in (("Name:", "name", selected_window.title[:40]),
+                                ("Interval (seconds):", "interval", "1.0"),
+                                ("Max interval (seconds):", "max_interval", f"{MAX_POLL_INTERVAL:g}"),
+                                ("Min change (%):", "min_change_percent", "0"),
+                                ("Change threshold:", "threshold", str(CHANGE_THRESHOLD)),
+                                ("Min box size (px):", "min_tile_size", str(MIN_TILE_SIZE))):
+        row = tk.Frame(target_window, bg="#f8f9fa")
+        row.pack(fill='x', padx=20, pady=5)
+        tk.Label(row, text=label, width=18, anchor='w', bg="#f8f9fa").pack(side=tk.LEFT)
+        var = tk.StringVar(value=default)
+        tk.Entry(row, textvariable=var, width=25).pack(side=tk.LEFT)
+        fields[key] = var
+
+    def save_target():
+        name = fields['name'].get().strip()
+        try:
+            interval = float(fields['interval'].get())
+            max_interval = float(fields['max_interval'].get())
+            min_change_percent = float(fields['min_change_percent'].get())
+            threshold = float(fields['threshold'].get())
+            min_tile_size = int(fields['min_tile_size'].get())
+        except ValueError:
+            messagebox.showerror("Error", "Intervals, threshold and box size must be numbers!")
+            return
+        if not name or scheduler.get_target(name):
+            messagebox.showerror("Error", "Please enter a unique target name!")
+            return
+
+        scheduler.add_target(WatchTarget(name, selected_window, selected_area,
+                                         interval=max(0.1, interval), threshold=threshold,
+                                         max_interval=max_interval,
+                                         min_change_percent=min_change_percent,
+                                         perceptual=store.get('alerts')['perceptual_prefilter'],
+                                         min_tile_size=max(1, min_tile_size),
+                                         ignore=ignore_regions,
+                                         adaptive=store.get('alerts')['adaptive_thresholds'],
+                                         compare_mode=store.get('alerts')['compare_mode'],
+                                         clip_frames=store.get('alerts')['clip_frames'],
+                                         clip_format=store.get('alerts')['clip_format']))
+        scheduler.start()
+        save_watch_targets()
+        target_window.destroy()
+
+    tk.Button(target_window, text="Add Target", command=save_target,
+              bg="#28a745", fg="white", font=("Arial", 10),
+              relief="flat", cursor="hand2", padx=10, pady=5).pack(pady=20)
+
+def selected_watch_target():
+    """Return the WatchTarget highlighted in the targets table, if any."""
+    selection = targets_tree.selection()
+    if not selection:
+        messagebox.showinfo("Info", "Please select a watch target first!")
+        return None
+    return scheduler.get_target(selection[0])
+
+def remove_watch_target():
+    """Remove the highlighted watch target."""
+    target = selected_watch_target()
+    if target:
+        scheduler.remove_target(target)
+        save_watch_targets()
+
+def save_watch_targets():
+    """Persist the watch targets so they can be restored on the next launch."""
+    store.save('targets', {'targets': [target.settings() for target in scheduler.targets]})
+
+def build_watch_target(spec, windows=None):
+    """Create a WatchTarget from saved settings, or None if its browser window is not open."""
+    windows = list_browser_windows() if windows is None else windows
+    window = next((win for win in windows if win.title == spec['window_title']), None)
+    if window is None:
+        print(f"Window for watch target {spec['name']} not found, skipping")
+        return None
+    return WatchTarget(spec['name'], window,
+                       tuple(spec['area']) if spec.get('area') else None,
+                       interval=spec['interval'], threshold=spec['threshold'],
+                       max_interval=spec['max_interval'],
+                       min_change_percent=spec.get('min_change_percent', 0),
+                       perceptual=spec.get('perceptual', False),
+                       min_tile_size=spec.get('min_tile_size', MIN_TILE_SIZE),
+                       ignore=spec.get('ignore'),
+                       adaptive=spec.get('adaptive', False),
+                       compare_mode=spec.get('compare_mode', COMPARE_RGB),
+                       clip_frames=spec.get('clip_frames', 0),
+                       clip_format=spec.get('clip_format', CLIP_GIF))
+
+def restore_watch_targets():
+    """Re-create saved watch targets whose browser windows are still open."""
+    windows = list_browser_windows()
+    for spec in store.get('targets')['targets']:
+        target = build_watch_target(spec, windows)
+        if target is not None:
+            scheduler.add_target(target)
+    if scheduler.targets:
+        scheduler.start()
+
+def on_settings_changed(name):
+    """Apply settings saved here or edited on disk to what is running (any thread)."""
+    global metrics_server
+    if name == 'targets':
+        # Our own saves match the running targets and change nothing
+        scheduler.sync_targets(store.get('targets')['targets'], build_watch_target)
+        if scheduler.targets:
+            scheduler.start()
+    elif name == 'alerts':
+        # The monitoring loop rebuilds its comparison and clip settings on its next tick
+        monitor_settings_changed.set()
+        port = store.get('alerts')['metrics_port']
+        if metrics_server is not None and metrics_server.port != port:
+            metrics_server.stop()
+            metrics_server = None
+        if port and metrics_server is None:
+            try:
+                metrics_server = MetricsServer(port=port)
+                metrics_server.start()
+            except OSError as e:
+                print(f"Could not start the metrics endpoint: {e}")
+                metrics_server = None
+
+def toggle_watch_target():
+    """Pause or resume the highlighted watch target."""
+    target = selected_watch_target()
+    if target:
+        target.paused = not target.paused
+
+def check_watch_target_now():
+    """Capture the highlighted watch target immediately and reset its interval."""
+    target = selected_watch_target()
+    if target:
+        scheduler.poke_target(target)
+
+def refresh_targets_view():
+    """Refresh the per-target state and statistics table."""
+    names = set()
+    for target in list(scheduler.targets):
+        stats = target.stats()
+        names.add(stats['name'])
+        last_change = stats['last_change'].strftime("%I:%M:%S %p") if stats['last_change'] else "-"
+        values = (stats['status'], f"{stats['interval']:.1f}s", f"{stats['fps']:.2f}", f"{stats['threshold']:g}",
+                  stats['ticks'], stats['changes'], last_change, f"{stats['diff_ms']:.1f}",
+                  f"{stats['skip_rate'] * 100:.0f}%")
+        if targets_tree.exists(stats['name']):
+            targets_tree.item(stats['name'], values=values)
+        else:
+            targets_tree.insert("", tk.END, iid=stats['name'], text=stats['name'], values=values)
+
+    for item in targets_tree.get_children():
+        if item not in names:
+            targets_tree.delete(item)
+
+    root.after(1000, refresh_targets_view)
 def toggle_area_highlight():
     """Toggle the highlight of the monitored area."""
     global show_monitored_area
@@ -997,6 +1237,121 @@ def select_monitoring_area():
     canvas.bind('<B1-Motion>', update_selection)
     canvas.bind('<ButtonRelease-1>', end_selection)
 
+def select_ignore_regions():
+    """Draw rectangles (clocks, ads, spinners) that monitoring should ignore."""
+    global ignore_regions
+
+    if not selected_window:
+        messagebox.showerror("Error", "Please select a window first!")
+        return
+
+    screenshot = capture_window(selected_window)
+    if screenshot is None:
+        messagebox.showerror("Error", "Could not capture window!")
+        return
+
+    ignore_window = Toplevel()
+    ignore_window.title("Select Areas to Ignore")
+    ignore_window.attributes('-topmost', True)
+
+    instructions = """
+    Click and drag to mark areas that change on their own (clocks, ads, spinners).
+    Ignored areas are shaded orange and are never compared.
+    """
+    tk.Label(ignore_window, text=instructions, justify=tk.LEFT, pady=10).pack()
+
+    photo = ImageTk.PhotoImage(screenshot)
+    canvas = tk.Canvas(ignore_window, width=screenshot.width, height=screenshot.height)
+    canvas.pack()
+    canvas.create_image(0, 0, image=photo, anchor='nw')
+    canvas.image = photo  # Keep reference
+
+    if selected_area:
+        canvas.create_rectangle(*selected_area, outline='blue', width=2)
+
+    rects = list(ignore_regions)
+    start_x = start_y = 0
+    rect_id = None
+
+    def draw_rect(rect):
+        canvas.create_rectangle(*rect, outline='orange', width=2, fill='orange',
+                                stipple='gray25', tags="ignore")
+
+    for rect in rects:
+        draw_rect(rect)
+
+    def start_rect(event):
+        nonlocal start_x, start_y, rect_id
+        start_x, start_y = event.x, event.y
+        rect_id = canvas.create_rectangle(start_x, start_y, start_x, start_y, outline='orange', width=2)
+
+    def update_rect(event):
+        if rect_id:
+            canvas.coords(rect_id, start_x, start_y, event.x, event.y)
+
+    def end_rect(event):
+        nonlocal rect_id
+        if not rect_id:
+            return
+        canvas.delete(rect_id)
+        rect_id = None
+        rect = (min(start_x, event.x), min(start_y, event.y), max(start_x, event.x), max(start_y, event.y))
+        if rect[2] - rect[0] < 3 or rect[3] - rect[1] < 3:
+            return
+        rects.append(rect)
+        draw_rect(rect)
+
+    def learn_rects():
+        """Watch the window for a few seconds and mark the areas that keep changing."""
+        learn_button.config(state=tk.DISABLED, text="Learning...")
+
+        def learn():
+            try:
+                with CaptureSession(selected_window) as session:
+                    learned = learn_noise_rects(session.grab_frame)
+            except Exception as e:
+                print(f"Error learning noisy areas: {e}")
+                learned = []
+
+            def show():
+                if not ignore_window.winfo_exists():
+                    return
+                rects.extend(learned)
+                for rect in learned:
+                    draw_rect(rect)
+                learn_button.config(state=tk.NORMAL, text="Learn Noisy Areas")
+                messagebox.showinfo("Learned", f"Found {len(learned)} noisy cell(s).", parent=ignore_window)
+            call_in_gui_thread(show)
+
+        threading.Thread(target=learn, daemon=True).start()
+
+    def clear_rects():
+        rects.clear()
+        canvas.delete("ignore")
+
+    def save_rects():
+        global ignore_regions
+        ignore_regions = rects
+        ignore_window.destroy()
+        if monitoring:
+            messagebox.showinfo("Info", "Ignored areas apply the next time monitoring starts.")
+
+    button_frame = tk.Frame(ignore_window)
+    button_frame.pack(pady=10)
+    for text, command, color in (("Save", save_rects, "#28a745"),
+                                 ("Learn Noisy Areas", learn_rects, "#17a2b8"),
+                                 ("Clear", clear_rects, "#ffc107"),
+                                 ("Cancel", ignore_window.destroy, "#dc3545")):
+        button = tk.Button(button_frame, text=text, command=command, bg=color, fg="white",
+                           font=("Arial", 10), relief="flat", cursor="hand2", padx=20, pady=5)
+        button.pack(side=tk.LEFT, padx=5)
+        if command is learn_rects:
+            learn_button = button
+
+    canvas.bind('<Button-1>', start_rect)
+    canvas.bind('<B1-Motion>', update_rect)
+    canvas.bind('<ButtonRelease-1>', end_rect)
+
 def on_closing():
     """Handle application closing."""
     if monitoring:
@@ -1004,26 +1359,22 @@ def on_closing():
                                   "Monitoring is still active. Are you sure you want to exit?"):
             return
     stop_telegram_command_checker()
+    scheduler.close()
+    notifier.stop()
+    history.close()
+    if metrics_server is not None:
+        metrics_server.stop()
+    store.stop()
     root.quit()
 def open_alert_settings():
     """Open a window to configure alert settings"""
     settings_window = tk.Toplevel(root)
     settings_window.title("Alert Settings")
-    settings_window.geometry("400x500")
+    settings_window.geometry("420x850")
     settings_window.configure(bg="#f8f9fa")
 
     # Load existing settings or use defaults
-    try:
-        with open('alert_settings.json', 'r') as f:
-            settings = json.load(f)
-    except FileNotFoundError:
-        settings = {
-            'min_change_percent': 5,
-            'cooldown_period': 60,
-            'notification_sound': True,
-            'telegram_alerts': True,
-            'desktop_notifications': True
-        }
+    settings = store.get('alerts')
 
     # Create settings controls
     tk.Label(settings_window, text="Alert Settings", font=("Arial", 14, "bold"), 
@@ -1056,16 +1407,59 @@ def open_alert_settings():
     tk.Checkbutton(settings_window, text="Show desktop notifications", 
                    variable=desktop_var, bg="#f8f9fa").pack(pady=5)
 
+    continuous_var = tk.BooleanVar(value=settings['continuous_monitoring'])
+    tk.Checkbutton(settings_window, text="Keep monitoring after a change (continuous mode)",
+                   variable=continuous_var, bg="#f8f9fa").pack(pady=5)
+
+    perceptual_var = tk.BooleanVar(value=settings['perceptual_prefilter'])
+    tk.Checkbutton(settings_window, text="Skip tiles with an unchanged perceptual hash (faster, less exact)",
+                   variable=perceptual_var, bg="#f8f9fa").pack(pady=5)
+
+    adaptive_var = tk.BooleanVar(value=settings['adaptive_thresholds'])
+    tk.Checkbutton(settings_window, text="Learn per-tile noise and ignore normal flicker",
+                   variable=adaptive_var, bg="#f8f9fa").pack(pady=5)
+
+    history_var = tk.BooleanVar(value=settings['history_enabled'])
+    tk.Checkbutton(settings_window, text="Keep a history of every change on disk",
+                   variable=history_var, bg="#f8f9fa").pack(pady=5)
+
+    tk.Label(settings_window, text="Frames before/after an alert saved as a clip (0 = off):",
+            bg="#f8f9fa").pack(pady=(10, 0))
+    clip_frame = tk.Frame(settings_window, bg="#f8f9fa")
+    clip_frame.pack(pady=5)
+    clip_frames_var = tk.IntVar(value=settings['clip_frames'])
+    tk.Spinbox(clip_frame, from_=0, to=60, textvariable=clip_frames_var, width=5).pack(side="left", padx=5)
+    clip_format_var = tk.StringVar(value=settings['clip_format'])
+    tk.OptionMenu(clip_frame, clip_format_var, *CLIP_FORMATS).pack(side="left", padx=5)
+
+    tk.Label(settings_window, text="Diff worker processes (0 = off, applies after restart):",
+            bg="#f8f9fa").pack(pady=(10, 0))
+    processes_var = tk.IntVar(value=settings['diff_processes'])
+    tk.Spinbox(settings_window, from_=0, to=64, textvariable=processes_var, width=5).pack(pady=5)
+
+    tk.Label(settings_window, text="Comparison mode (luma2x/luma4x are faster, coarser):",
+            bg="#f8f9fa").pack(pady=(10, 0))
+    compare_var = tk.StringVar(value=settings['compare_mode'])
+    tk.OptionMenu(settings_window, compare_var, *COMPARE_MODES).pack(pady=5)
+
     def save_settings():
         settings = {
             'min_change_percent': change_scale.get(),
             'cooldown_period': cooldown_scale.get(),
             'notification_sound': sound_var.get(),
             'telegram_alerts': telegram_var.get(),
-            'desktop_notifications': desktop_var.get()
+            'desktop_notifications': desktop_var.get(),
+            'continuous_monitoring': continuous_var.get(),
+            'perceptual_prefilter': perceptual_var.get(),
+            'adaptive_thresholds': adaptive_var.get(),
+            'history_enabled': history_var.get(),
+            'clip_frames': clip_frames_var.get(),
+            'clip_format': clip_format_var.get(),
+            'diff_processes': processes_var.get(),
+            'compare_mode': compare_var.get()
         }
-        with open('alert_settings.json', 'w') as f:
-            json.dump(settings, f)
+        # Settings without a control here (e.g. metrics_port) are kept
+        store.save('alerts', {**store.get('alerts'), **settings})
         settings_window.destroy()
 
     # Save button
@@ -1073,184 +1467,273 @@ def open_alert_settings():
               bg="#28a745", fg="white", font=("Arial", 10),
               relief="flat", cursor="hand2", padx=10, pady=5).pack(pady=20)
 
-# Initialize tkinter application
-root = tk.Tk()
-root.title("Browser Monitor")
-root.geometry("800x475")
-root.configure(bg="#f8f9fa")
-
-# Set program icon (if available)
-try:
-    root.iconbitmap('monitor_icon.ico')
-except:
-    pass
-
-# Header Title
-header = tk.Label(root, text="Browser Change Monitor", font=("Arial", 18, "bold"), bg="#f8f9fa", fg="#343a40")
-header.pack(pady=10)
-
-# Window Selection Section
-selected_window_label = tk.Label(root, text="No browser window selected", wraplength=600, justify="center", 
-                               font=("Arial", 10), bg="#f8f9fa", fg="#6c757d", relief="solid", bd=1)
-selected_window_label.pack(pady=5, ipadx=10, ipady=10)
-
-# Main Buttons Frame
-main_button_frame = tk.Frame(root, bg="#f8f9fa")
-main_button_frame.pack(pady=10)
-
-# First row of buttons - Core Functions
-first_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
-first_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
-
-# Core functionality buttons
-tk.Button(first_row_frame, 
-         text="Select Window", 
-         command=select_window, 
-         font=("Arial", 10), 
-         bg="#007bff", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(first_row_frame, 
-         text="Start Monitoring", 
-         command=start_monitoring, 
-         font=("Arial", 10), 
-         bg="#28a745", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(first_row_frame, 
-         text="Stop Monitoring", 
-         command=stop_monitoring, 
-         font=("Arial", 10), 
-         bg="#dc3545", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-# Second row of buttons - Telegram Configuration
-second_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
-second_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
-
-tk.Button(second_row_frame, 
-         text="Telegram Setup", 
-         command=setup_telegram_config, 
-         font=("Arial", 10), 
-         bg="#17a2b8", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(second_row_frame, 
-         text="View Telegram Config", 
-         command=view_telegram_config, 
-         font=("Arial", 10), 
-         bg="#6c757d", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(second_row_frame, 
-         text="Test Telegram", 
-         command=test_telegram_configuration, 
-         font=("Arial", 10), 
-         bg="#ffc107", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(second_row_frame,
-         text="Alert Settings",
-         command=open_alert_settings,
-         font=("Arial", 10),
-         bg="#17a2b8",
-         fg="white",
-         relief="flat",
-         cursor="hand2",
-         padx=10,
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-# Third row of buttons - Utilities
-third_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
-third_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
-
-tk.Button(third_row_frame, 
-         text="Select Area", 
-         command=select_monitoring_area, 
-         font=("Arial", 10), 
-         bg="#17a2b8", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(third_row_frame, 
-         text="Show/Hide Area", 
-         command=toggle_area_highlight, 
-         font=("Arial", 10), 
-         bg="#6c757d", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(third_row_frame, 
-         text="Sound Test", 
-         command=play_sound, 
-         font=("Arial", 10), 
-         bg="#6c757d", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-tk.Button(third_row_frame, 
-         text="Exit", 
-         command=on_closing, 
-         font=("Arial", 10), 
-         bg="#343a40", 
-         fg="white", 
-         relief="flat", 
-         cursor="hand2", 
-         padx=10, 
-         pady=5).pack(side=tk.LEFT, padx=20)
-
-# Status Indicator Section
-status_frame = tk.Frame(root, bg="#f8f9fa")
-status_frame.pack(pady=(20, 15))
-
-canvas = tk.Canvas(status_frame, width=50, height=50, bg="#f8f9fa", highlightthickness=0)
-canvas.grid(row=0, column=0, padx=10)
-
-status_label = tk.Label(status_frame, text="Stopped", font=("Arial", 12), bg="#f8f9fa", fg="red")
-status_label.grid(row=0, column=1)
-
-# Initialize status indicator as "Stopped"
-update_status_indicator(False)
-
-# Set window close handler
-root.protocol("WM_DELETE_WINDOW", on_closing)
-
-# Start checking for Telegram commands if configured
-if load_telegram_config():
-    start_telegram_command_checker()
-
-# Start the application
-root.mainloop()
+# Diff worker processes may be spawned, and a spawned worker imports this script:
+# everything that builds the GUI or starts threads only runs in the real process
+if __name__ == "__main__":
+    # Lets a frozen (PyInstaller) build act as a spawned worker
+    multiprocessing.freeze_support()
+
+    # Initialize pygame mixer
+    pygame.mixer.init()
+
+    # Initialize tkinter application
+    root = tk.Tk()
+    root.bind(GUI_CALL_EVENT, run_gui_calls)
+    root.title("Browser Monitor")
+    root.geometry("800x700")
+    root.configure(bg="#f8f9fa")
+
+    # Set program icon (if available)
+    try:
+        root.iconbitmap('monitor_icon.ico')
+    except:
+        pass
+
+    # Header Title
+    header = tk.Label(root, text="Browser Change Monitor", font=("Arial", 18, "bold"), bg="#f8f9fa", fg="#343a40")
+    header.pack(pady=10)
+
+    # Window Selection Section
+    selected_window_label = tk.Label(root, text="No browser window selected", wraplength=600, justify="center", 
+                                   font=("Arial", 10), bg="#f8f9fa", fg="#6c757d", relief="solid", bd=1)
+    selected_window_label.pack(pady=5, ipadx=10, ipady=10)
+
+    # Main Buttons Frame
+    main_button_frame = tk.Frame(root, bg="#f8f9fa")
+    main_button_frame.pack(pady=10)
+
+    # First row of buttons - Core Functions
+    first_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
+    first_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
+
+    # Core functionality buttons
+    tk.Button(first_row_frame, 
+             text="Select Window", 
+             command=select_window, 
+             font=("Arial", 10), 
+             bg="#007bff", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(first_row_frame, 
+             text="Start Monitoring", 
+             command=start_monitoring, 
+             font=("Arial", 10), 
+             bg="#28a745", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(first_row_frame, 
+             text="Stop Monitoring", 
+             command=stop_monitoring, 
+             font=("Arial", 10), 
+             bg="#dc3545", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    # Second row of buttons - Telegram Configuration
+    second_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
+    second_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
+
+    tk.Button(second_row_frame, 
+             text="Telegram Setup", 
+             command=setup_telegram_config, 
+             font=("Arial", 10), 
+             bg="#17a2b8", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(second_row_frame, 
+             text="View Telegram Config", 
+             command=view_telegram_config, 
+             font=("Arial", 10), 
+             bg="#6c757d", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(second_row_frame, 
+             text="Test Telegram", 
+             command=test_telegram_configuration, 
+             font=("Arial", 10), 
+             bg="#ffc107", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(second_row_frame,
+             text="Alert Settings",
+             command=open_alert_settings,
+             font=("Arial", 10),
+             bg="#17a2b8",
+             fg="white",
+             relief="flat",
+             cursor="hand2",
+             padx=10,
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    # Third row of buttons - Utilities
+    third_row_frame = tk.Frame(main_button_frame, bg="#f8f9fa")
+    third_row_frame.pack(pady=(15, 15))  # Equal padding top and bottom
+
+    tk.Button(third_row_frame, 
+             text="Select Area", 
+             command=select_monitoring_area, 
+             font=("Arial", 10), 
+             bg="#17a2b8", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(third_row_frame,
+             text="Ignore Areas",
+             command=select_ignore_regions,
+             font=("Arial", 10),
+             bg="#17a2b8",
+             fg="white",
+             relief="flat",
+             cursor="hand2",
+             padx=10,
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(third_row_frame, 
+             text="Show/Hide Area", 
+             command=toggle_area_highlight, 
+             font=("Arial", 10), 
+             bg="#6c757d", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(third_row_frame, 
+             text="Sound Test", 
+             command=play_sound, 
+             font=("Arial", 10), 
+             bg="#6c757d", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    tk.Button(third_row_frame, 
+             text="Exit", 
+             command=on_closing, 
+             font=("Arial", 10), 
+             bg="#343a40", 
+             fg="white", 
+             relief="flat", 
+             cursor="hand2", 
+             padx=10, 
+             pady=5).pack(side=tk.LEFT, padx=20)
+
+    # Status Indicator Section
+    status_frame = tk.Frame(root, bg="#f8f9fa")
+    status_frame.pack(pady=(20, 15))
+
+    canvas = tk.Canvas(status_frame, width=50, height=50, bg="#f8f9fa", highlightthickness=0)
+    canvas.grid(row=0, column=0, padx=10)
+
+    status_label = tk.Label(status_frame, text="Stopped", font=("Arial", 12), bg="#f8f9fa", fg="red")
+    status_label.grid(row=0, column=1)
+
+    # Initialize status indicator as "Stopped"
+    update_status_indicator(False)
+
+    # Watch Targets Section
+    targets_frame = tk.Frame(root, bg="#f8f9fa")
+    targets_frame.pack(fill='x', padx=20, pady=(0, 10))
+
+    target_columns = ("status", "interval", "fps", "threshold", "ticks", "changes", "last_change", "diff_ms",
+                      "skip_rate")
+    targets_tree = ttk.Treeview(targets_frame, columns=target_columns, height=6)
+    targets_tree.heading("#0", text="Target")
+    targets_tree.column("#0", width=160)
+    for column, heading, width in zip(target_columns,
+                                      ("Status", "Interval", "FPS", "Threshold", "Ticks", "Changes", "Last Change",
+                                       "Diff ms", "Skipped"),
+                                      (90, 55, 45, 65, 50, 55, 85, 55, 55)):
+        targets_tree.heading(column, text=heading)
+        targets_tree.column(column, width=width, anchor="center")
+    targets_tree.pack(fill='x')
+
+    targets_button_frame = tk.Frame(targets_frame, bg="#f8f9fa")
+    targets_button_frame.pack(pady=(10, 0))
+
+    for text, command, color in (("Add Target", add_watch_target, "#007bff"),
+                                 ("Check Now", check_watch_target_now, "#17a2b8"),
+                                 ("Pause/Resume Target", toggle_watch_target, "#6c757d"),
+                                 ("Remove Target", remove_watch_target, "#dc3545")):
+        tk.Button(targets_button_frame,
+                 text=text,
+                 command=command,
+                 font=("Arial", 10),
+                 bg=color,
+                 fg="white",
+                 relief="flat",
+                 cursor="hand2",
+                 padx=10,
+                 pady=5).pack(side=tk.LEFT, padx=20)
+
+    # Change alerts are delivered by background workers, never on the capture thread
+    notifier = NotificationDispatcher(on_failure=notification_failed)
+    notifier.add_channel("sound", play_alert_sound, retries=0)
+    notifier.add_channel("Telegram", send_telegram_notification, timeout=TELEGRAM_TIMEOUT)
+    notifier.start()
+
+    # Local Prometheus/JSON metrics endpoint, if a port is configured
+    metrics_server = None
+    if store.get('alerts')['metrics_port']:
+        try:
+            metrics_server = MetricsServer(port=store.get('alerts')['metrics_port'])
+            metrics_server.start()
+        except OSError as e:
+            print(f"Could not start the metrics endpoint: {e}")
+            metrics_server = None
+
+    # Multi-target scheduler, started when the first target is added
+    scheduler = MonitorScheduler(on_change=on_target_change, processes=store.get('alerts')['diff_processes'])
+    restore_watch_targets()
+    # Saved and hand-edited settings are applied to the running monitors
+    store.add_listener(on_settings_changed)
+    refresh_targets_view()
+
+    # Telegram commands for the watch targets; interval and threshold changes are saved like GUI edits
+    remote_control = RemoteControl(lambda: scheduler, on_update=lambda target: save_watch_targets(), extra_help=[
+        "/start_monitoring - Start monitoring",
+        "/stop_monitoring - Stop monitoring",
+        "/status - Check monitoring status"
+    ])
+
+    # Reload settings files edited outside the app
+    store.start()
+
+    # Set window close handler
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Start checking for Telegram commands if configured
+    if load_telegram_config():
+        start_telegram_command_checker()
+
+    # Start the application
+    root.mainloop()
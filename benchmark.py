@@ -0,0 +1,389 @@
+"""Benchmark the capture -> diff -> notify pipeline without a display.
+
+Usage:
+
+    python benchmark.py [--frames 30] [--resolutions 1280x720,1920x1080]
+                        [--scenarios static,text,scroll,repaint] [--engines legacy,tiles,pyramid,rgb]
+                        [--recorded DIR] [--processes N] [--output results.json] [--baseline old.json]
+
+Every scenario is a sequence of frames replayed through a FakeCapture,
+which hands out mss-style BGRA grabs so the real conversion code runs.
+The synthetic scenarios are "static" (nothing changes), "text" (a word
+is rewritten every frame), "scroll" (the page moves 8 rows per frame) and
+"repaint" (a new page every frame); --recorded adds the images of a
+directory, in name order, as scenario "recorded" at their own size.
+
+Engines:
+    legacy   divide_image_into_tiles() + calculate_image_difference() on PIL images
+    tiles    detect_changes() on whole tiles
+    pyramid  detect_changes() refined to MIN_TILE_SIZE cells
+    rgb, luma, luma2x, luma4x
+             a WatchTarget in that comparison mode (prefilter, diff and
+             region merging), in --processes worker processes if given
+
+Each tick is timed per stage (capture, diff, notify = overlay + PNG
+encode, only on ticks that found a change) and reported as latency
+percentiles in milliseconds, with frames/sec and the peak memory a short
+second pass allocates under tracemalloc. The JSON written by --output can
+be passed as --baseline to a later run, which then reports every case
+whose median tick got more than REGRESSION_TOLERANCE slower and exits 1.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from PIL import Image
+from capture import FrameRing, screenshot_to_image
+from diff_engine import (TILE_SIZE, MIN_TILE_SIZE, CHANGE_THRESHOLD, COMPARE_MODES, divide_image_into_tiles,
+                         calculate_image_difference, detect_changes, render_overlay)
+from process_pool import ProcessDiffPool
+from scheduler import WatchTarget
+from telegram_client import encode_png
+
+SCENARIOS = ("static", "text", "scroll", "repaint")
+ENGINES = ("legacy", "tiles", "pyramid") + tuple(COMPARE_MODES)
+STAGES = ("capture", "diff", "notify", "total")
+DEFAULT_RESOLUTIONS = "1280x720,1920x1080"
+DEFAULT_FRAMES = 30
+# Rows the page moves per frame in the scroll scenario
+SCROLL_STEP = 8
+# Ticks replayed under tracemalloc to measure peak memory
+MEMORY_FRAMES = 5
+# A case regresses when its median tick is this much slower than the baseline
+REGRESSION_TOLERANCE = 1.2
+
+class FakeScreenshot:
+    """The parts of an mss ScreenShot the capture code uses, built from an RGB frame."""
+
+    def __init__(self, frame):
+        self.height, self.width = frame.shape[:2]
+        bgra = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        bgra[:, :, :3] = frame[:, :, ::-1]
+        bgra[:, :, 3] = 255
+        self.raw = bytearray(bgra.tobytes())
+
+class FakeCapture:
+    """Replay frames through the same interface as CaptureSession, looping at the end.
+
+    The BGRA grabs are built up front, so only the conversion that a real
+    session does per frame is timed.
+    """
+
+    def __init__(self, frames):
+        # Repeated frames (the static scenario) share one grab
+        grabs = {}
+        for frame in frames:
+            if id(frame) not in grabs:
+                grabs[id(frame)] = FakeScreenshot(frame)
+        self.screenshots = [grabs[id(frame)] for frame in frames]
+        self._ring = FrameRing()
+        self._index = 0
+
+    def _grab(self, full=False):
+        screenshot = self.screenshots[self._index]
+        self._index = (self._index + 1) % len(self.screenshots)
+        return screenshot
+
+    def grab(self, full=False):
+        return screenshot_to_image(self._grab(full))
+
+    def grab_frame(self, full=False):
+        return self._ring.store(self._grab(full))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def synthetic_page(width, height, rng):
+    """Draw a page-like RGB frame: a header bar and lines of dark 'text' on white."""
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    page[:min(60, height)] = rng.integers(0, 256, 3, dtype=np.uint8)
+    for top in range(80, height - 12, 24):
+        right = int(rng.integers(width // 3, width)) - 40
+        if right > 40:
+            glyphs = rng.random((12, right - 40)) < 0.3
+            page[top:top + 12, 40:right][glyphs] = 30
+    return page
+
+def scenario_frames(name, width, height, count, seed=0):
+    """Return the frames of a synthetic scenario."""
+    rng = np.random.default_rng(seed)
+    if name == "static":
+        return [synthetic_page(width, height, rng)] * count
+    if name == "text":
+        page = synthetic_page(width, height, rng)
+        frames = []
+        for _ in range(count):
+            frame = page.copy()
+            # A short word near the middle of the page is rewritten
+            top, left = height // 2, width // 2
+            word = frame[top:top + 12, left:left + 60]
+            word[:] = 255
+            word[rng.random(word.shape[:2]) < 0.3] = 30
+            frames.append(frame)
+        return frames
+    if name == "scroll":
+        page = synthetic_page(width, height + SCROLL_STEP * count, rng)
+        return [page[index * SCROLL_STEP:index * SCROLL_STEP + height] for index in range(count)]
+    if name == "repaint":
+        return [synthetic_page(width, height, rng) for _ in range(count)]
+    raise ValueError(f"Unknown scenario: {name}")
+
+def load_recorded(directory):
+    """Load the images of a directory, in name order, as RGB frames of the first image's size."""
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        try:
+            with Image.open(os.path.join(directory, name)) as image:
+                frame = np.asarray(image.convert("RGB"))
+        except OSError:
+            continue
+        if frames and frame.shape != frames[0].shape:
+            print(f"Skipping {name}: its size differs from the first frame")
+            continue
+        frames.append(frame)
+    return frames
+
+class LegacyEngine:
+    """The original per-tile PIL comparison."""
+
+    def capture(self, session):
+        return session.grab()
+
+    def compare(self, previous, current):
+        boxes = []
+        for (box, last_tile), (_, current_tile) in zip(divide_image_into_tiles(previous, TILE_SIZE),
+                                                       divide_image_into_tiles(current, TILE_SIZE)):
+            if calculate_image_difference(last_tile, current_tile) > CHANGE_THRESHOLD:
+                boxes.append(box)
+        return boxes
+
+class ArrayEngine:
+    """detect_changes() on capture arrays, on whole tiles or refined to min_tile_size cells."""
+
+    def __init__(self, min_tile_size=None):
+        self.min_tile_size = min_tile_size
+
+    def capture(self, session):
+        return session.grab_frame()
+
+    def compare(self, previous, current):
+        return detect_changes(previous, current, TILE_SIZE, CHANGE_THRESHOLD, 0, None, self.min_tile_size)[0]
+
+class TargetEngine:
+    """A WatchTarget, as the scheduler runs it; it keeps its own baseline."""
+
+    def __init__(self, mode, diff_pool=None):
+        self.target = WatchTarget("benchmark", None, compare_mode=mode)
+        self.target.diff_pool = diff_pool
+
+    def capture(self, session):
+        return session.grab_frame()
+
+    def compare(self, previous, current):
+        event = self.target.process_frame(current)
+        return event["boxes"] if event else []
+
+def make_engine(name, diff_pool=None):
+    if name == "legacy":
+        return LegacyEngine()
+    if name == "tiles":
+        return ArrayEngine()
+    if name == "pyramid":
+        return ArrayEngine(MIN_TILE_SIZE)
+    if name in COMPARE_MODES:
+        return TargetEngine(name, diff_pool)
+    raise ValueError(f"Unknown engine: {name}")
+
+def run_ticks(engine, session, count):
+    """Run count ticks after the first grab; returns (timings per stage, changed ticks)."""
+    timings = {stage: [] for stage in STAGES}
+    changed = 0
+    previous = engine.capture(session)
+    engine.compare(previous, previous)
+    for _ in range(count):
+        started = time.perf_counter()
+        current = engine.capture(session)
+        captured = time.perf_counter()
+        boxes = engine.compare(previous, current)
+        compared = time.perf_counter()
+        if boxes:
+            changed += 1
+            encode_png(render_overlay(current, boxes))
+            timings["notify"].append(time.perf_counter() - compared)
+        timings["capture"].append(captured - started)
+        timings["diff"].append(compared - captured)
+        timings["total"].append(time.perf_counter() - started)
+        previous = current
+    return timings, changed
+
+def summarize(samples):
+    """Latency percentiles of a list of durations, in milliseconds."""
+    if not samples:
+        return None
+    millis = np.array(samples) * 1000
+    return {
+        "mean": round(float(millis.mean()), 3),
+        "p50": round(float(np.percentile(millis, 50)), 3),
+        "p90": round(float(np.percentile(millis, 90)), 3),
+        "p99": round(float(np.percentile(millis, 99)), 3),
+        "max": round(float(millis.max()), 3)
+    }
+
+def run_case(scenario, frames, engine_name, count, diff_pool=None):
+    """Benchmark one engine on one frame sequence and return its result dict."""
+    height, width = frames[0].shape[:2]
+    session = FakeCapture(frames)
+    timings, changed = run_ticks(make_engine(engine_name, diff_pool), session, count)
+
+    # Peak memory is measured separately; tracemalloc slows the timed ticks down
+    tracemalloc.start()
+    try:
+        run_ticks(make_engine(engine_name, diff_pool), FakeCapture(frames[:MEMORY_FRAMES + 1]),
+                  min(count, MEMORY_FRAMES))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if diff_pool is not None:
+        diff_pool.release("benchmark")
+
+    total = sum(timings["total"])
+    return {
+        "scenario": scenario,
+        "resolution": f"{width}x{height}",
+        "engine": engine_name,
+        "frames": count,
+        "changed_frames": changed,
+        "fps": round(count / total, 2) if total else None,
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        "stages": {stage: summarize(timings[stage]) for stage in STAGES}
+    }
+
+def parse_resolutions(text):
+    resolutions = []
+    for item in text.split(","):
+        width, height = item.lower().split("x")
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+def compare_results(baseline, results, tolerance=REGRESSION_TOLERANCE):
+    """Return a message for every case whose median tick regressed against a baseline run."""
+    previous = {(item["scenario"], item["resolution"], item["engine"]): item for item in baseline["results"]}
+    regressions = []
+    for item in results:
+        old = previous.get((item["scenario"], item["resolution"], item["engine"]))
+        if old is None:
+            continue
+        old_p50 = old["stages"]["total"]["p50"]
+        new_p50 = item["stages"]["total"]["p50"]
+        if old_p50 and new_p50 > old_p50 * tolerance:
+            regressions.append(f"{item['engine']} on {item['scenario']} at {item['resolution']}: "
+                               f"{old_p50:.2f} ms -> {new_p50:.2f} ms")
+    return regressions
+
+def main(argv=None):
+    """Run the benchmarks. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark the change detection pipeline headlessly.")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="ticks timed per case")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="comma separated WIDTHxHEIGHT")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--recorded", help="directory of recorded frames to replay as well")
+    parser.add_argument("--processes", type=int, default=0, help="worker processes for the WatchTarget engines")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions")
+    args = parser.parse_args(argv)
+
+    engines = [name for name in args.engines.split(",") if name]
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        print(f"Unknown engine(s): {', '.join(unknown)}")
+        return 2
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)}")
+        return 2
+    try:
+        resolutions = parse_resolutions(args.resolutions)
+    except ValueError:
+        print(f"Invalid resolutions: {args.resolutions}")
+        return 2
+
+    # Frames are only generated when their case runs, to keep memory flat
+    cases = [(scenario, lambda scenario=scenario, width=width, height=height:
+              scenario_frames(scenario, width, height, args.frames + 1))
+             for width, height in resolutions for scenario in scenarios]
+    if args.recorded:
+        recorded = load_recorded(args.recorded)
+        if len(recorded) < 2:
+            print(f"Need at least two frames in {args.recorded}")
+            return 1
+        cases.append(("recorded", lambda: recorded))
+
+    diff_pool = ProcessDiffPool(args.processes) if args.processes else None
+    results = []
+    try:
+        for scenario, make_frames in cases:
+            frames = make_frames()
+            for engine_name in engines:
+                result = run_case(scenario, frames, engine_name, args.frames,
+                                  diff_pool if engine_name in COMPARE_MODES else None)
+                results.append(result)
+                stages = result["stages"]
+                print(f"{scenario:>8} {result['resolution']:>9} {engine_name:>8}: "
+                      f"diff {stages['diff']['p50']:7.2f} ms p50, "
+                      f"tick {stages['total']['p50']:7.2f} ms p50 {stages['total']['p99']:7.2f} ms p99 "
+                      f"{result['fps']:8.1f} fps {result['peak_memory_mb']:7.1f} MB "
+                      f"({result['changed_frames']}/{result['frames']} changed)")
+    finally:
+        if diff_pool is not None:
+            diff_pool.close()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "frames": args.frames,
+            "tile_size": TILE_SIZE,
+            "min_tile_size": MIN_TILE_SIZE,
+            "threshold": CHANGE_THRESHOLD,
+            "processes": args.processes if diff_pool is not None else 0
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read baseline {args.baseline}: {e}")
+            return 1
+        regressions = compare_results(baseline, results)
+        for message in regressions:
+            print(f"Regression: {message}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
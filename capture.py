@@ -0,0 +1,173 @@
+import time
+import mss
+import numpy as np
+from PIL import Image
+from metrics import metrics
+
+# How often (seconds) a session re-reads the window geometry from the OS
+GEOMETRY_REFRESH_INTERVAL = 2.0
+
+def window_geometry(window):
+    """Read a window's (left, top, width, height) with a single OS call."""
+    try:
+        box = window.box
+        left, top, width, height = box.left, box.top, box.width, box.height
+    except AttributeError:
+        left, top, width, height = window.left, window.top, window.width, window.height
+    return max(0, left), max(0, top), width, height
+
+class ScreenArea:
+    """A fixed screen rectangle that can be captured like a window."""
+
+    def __init__(self, left, top, width, height, title="Screen area"):
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.title = title
+
+def screenshot_to_bgra(screenshot):
+    """View an mss screenshot's buffer as an HxWx4 BGRA array without copying."""
+    return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+
+def screenshot_to_array(screenshot):
+    """View an mss screenshot's BGRA buffer as an HxWx3 RGB array without copying."""
+    return screenshot_to_bgra(screenshot)[:, :, 2::-1]
+
+def screenshot_to_image(screenshot):
+    """Build a PIL RGB image from an mss screenshot, swizzling BGRA in the decoder.
+
+    Avoids screenshot.rgb, which builds an intermediate RGB bytes object.
+    """
+    return Image.frombuffer("RGB", (screenshot.width, screenshot.height), screenshot.raw, "raw", "BGRX", 0, 1)
+
+class FrameRing:
+    """Preallocated frame buffers that consecutive grabs are copied into in turn.
+
+    With the default two slots the previous and the current frame each own
+    a buffer, so a monitoring loop allocates nothing per frame. store()
+    copies the BGRA grab plane by plane into a contiguous RGB slot (alpha is
+    dropped); numpy diffs a contiguous frame several times faster than a
+    strided view of the BGRA buffer, which more than pays for the copy. A
+    returned frame stays valid until the ring wraps around to its slot.
+    """
+
+    def __init__(self, slots=2):
+        self._buffers = [None] * slots
+        self._index = 0
+
+    def store(self, screenshot):
+        """Copy a screenshot into the next slot and return it as an HxWx3 RGB array."""
+        return self.store_bgra(screenshot_to_bgra(screenshot))
+
+    def store_bgra(self, bgra):
+        """Copy an HxWx4 BGRA array (or a crop of one) into the next slot as RGB."""
+        buffer = self._buffers[self._index]
+        if buffer is None or buffer.shape[:2] != bgra.shape[:2]:
+            buffer = np.empty((bgra.shape[0], bgra.shape[1], 3), dtype=np.uint8)
+            self._buffers[self._index] = buffer
+        for channel in range(3):
+            buffer[:, :, channel] = bgra[:, :, 2 - channel]
+        self._index = (self._index + 1) % len(self._buffers)
+        return buffer
+
+def area_region(monitor, area):
+    """Translate a window-relative (left, top, right, bottom) area into a screen region."""
+    left = min(max(0, area[0]), monitor["width"])
+    top = min(max(0, area[1]), monitor["height"])
+    right = min(max(left, area[2]), monitor["width"])
+    bottom = min(max(top, area[3]), monitor["height"])
+    return {
+        "left": monitor["left"] + left,
+        "top": monitor["top"] + top,
+        "width": right - left,
+        "height": bottom - top
+    }
+
+class CaptureSession:
+    """Long-lived screen capture bound to one window, or one area of it.
+
+    Keeps a single mss handle (and the grab buffers it owns) open for the
+    lifetime of a monitoring run instead of reconnecting to the display on
+    every frame. Window geometry is cached and only re-read every
+    GEOMETRY_REFRESH_INTERVAL seconds or after a failed grab, so moved or
+    resized windows are picked up without querying the OS on every tick.
+
+    mss handles are tied to the thread that created them, so a session must
+    be created and used on the monitoring thread.
+
+    When an area is given, grab() asks mss for just that sub-rectangle of the
+    window; grab(full=True) captures the whole window on demand.
+    grab_frame() returns the pixels as an array view into a FrameRing
+    instead of a PIL image, for the diff loop. The geometry, grab and
+    convert stages are timed into the metrics under the session's name.
+    """
+
+    def __init__(self, window, area=None, geometry_refresh=GEOMETRY_REFRESH_INTERVAL, name="monitor"):
+        self.window = window
+        self.area = area
+        self.geometry_refresh = geometry_refresh
+        self.name = name
+        self.monitor = None
+        self.region = None
+        self._sct = mss.mss()
+        self._ring = FrameRing()
+        self._geometry_time = 0
+
+    def refresh_geometry(self):
+        """Re-read the window geometry, returning True if it changed."""
+        with metrics.timer("stage_seconds", target=self.name, stage="geometry"):
+            left, top, width, height = window_geometry(self.window)
+        monitor = {"left": left, "top": top, "width": width, "height": height}
+        self._geometry_time = time.monotonic()
+        changed = monitor != self.monitor
+        self.monitor = monitor
+        self.region = area_region(monitor, self.area) if self.area else monitor
+        return changed
+
+    def grab(self, full=False):
+        """Grab the monitored area as a PIL RGB image, or None on failure.
+
+        Pass full=True to capture the whole window regardless of the area.
+        """
+        screenshot = self._grab(full)
+        if screenshot is None:
+            return None
+        with metrics.timer("stage_seconds", target=self.name, stage="convert"):
+            return screenshot_to_image(screenshot)
+
+    def grab_frame(self, full=False):
+        """Grab the monitored area as an HxWx3 RGB array, or None on failure.
+
+        The array lives in a two-slot ring, so only the last two frames stay valid.
+        """
+        screenshot = self._grab(full)
+        if screenshot is None:
+            return None
+        with metrics.timer("stage_seconds", target=self.name, stage="convert"):
+            return self._ring.store(screenshot)
+
+    def _grab(self, full):
+        try:
+            if self.monitor is None or time.monotonic() - self._geometry_time >= self.geometry_refresh:
+                self.refresh_geometry()
+            with metrics.timer("stage_seconds", target=self.name, stage="grab"):
+                return self._sct.grab(self.monitor if full else self.region)
+        except Exception as e:
+            print(f"Screenshot capture error: {e}")
+            metrics.inc("capture_failures_total", target=self.name)
+            # Force a geometry lookup on the next grab in case the window moved
+            self.monitor = None
+            return None
+
+    def close(self):
+        """Release the display connection."""
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
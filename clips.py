@@ -0,0 +1,185 @@
+import os
+import time
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+from PIL import Image, ImageDraw
+from diff_engine import image_to_array
+from history import safe_filename
+
+# Frames kept before and after an alert by default
+CLIP_PRE_FRAMES = 5
+CLIP_POST_FRAMES = 5
+# Directory clips are saved in, one subdirectory per target
+CLIP_DIR = "clips"
+# Clip formats: animated GIF or animated PNG
+CLIP_GIF = "gif"
+CLIP_PNG = "png"
+CLIP_FORMATS = (CLIP_GIF, CLIP_PNG)
+# Wider clips are scaled down to this width
+CLIP_MAX_WIDTH = 1280
+# Bounds (milliseconds) of how long one clip frame is shown
+CLIP_MIN_FRAME_MS = 100
+CLIP_MAX_FRAME_MS = 2000
+
+class MappedFrameRing:
+    """The last slots frames, kept in a memory-mapped temporary file.
+
+    The file is sized for the frame shape on the first push() (and again
+    only if the shape changes), so steady-state capture copies each frame
+    into its slot without allocating. Being file-backed, a long ring of
+    large frames can be paged out by the OS instead of pinning RAM.
+    Frames are addressed by the sequence number push() returns.
+    """
+
+    def __init__(self, slots):
+        self.slots = max(1, slots)
+        self.seq = 0
+        self._start = 0
+        self._frames = None
+        self._times = [0.0] * self.slots
+        self._file = None
+
+    def push(self, frame, when=None):
+        """Copy a frame into the next slot and return its sequence number."""
+        array = image_to_array(frame)
+        if self._frames is None or self._frames.shape[1:] != array.shape:
+            self._allocate(array.shape)
+        slot = self.seq % self.slots
+        self._frames[slot] = array
+        self._times[slot] = time.time() if when is None else when
+        self.seq += 1
+        return self.seq - 1
+
+    def get(self, seq):
+        """Return (time, frame view) for a sequence number, or None once it was overwritten."""
+        if seq < max(self._start, self.seq - self.slots) or seq >= self.seq:
+            return None
+        slot = seq % self.slots
+        return self._times[slot], self._frames[slot]
+
+    def _allocate(self, shape):
+        self.close()
+        self._file = tempfile.TemporaryFile(prefix="frame-ring-")
+        self._frames = np.memmap(self._file, dtype=np.uint8, mode="w+", shape=(self.slots,) + tuple(shape))
+        # Frames pushed before a resize no longer exist
+        self._start = self.seq
+
+    def close(self):
+        # The mapping is released with the last view of it
+        self._frames = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def save_clip(frames, times, marked_from, boxes, path, clip_format=CLIP_GIF, max_width=CLIP_MAX_WIDTH):
+    """Save frames as an animated GIF or PNG, outlining boxes from frame marked_from on."""
+    images = []
+    for index, frame in enumerate(frames):
+        image = Image.fromarray(frame if frame.shape[2] != 1 else frame[:, :, 0]).convert("RGB")
+        if index >= marked_from and boxes:
+            draw = ImageDraw.Draw(image)
+            for box in boxes:
+                draw.rectangle(box, outline="red", width=3)
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.BILINEAR)
+        images.append(image)
+
+    # Played back at the pace the frames were captured, within readable bounds
+    gaps = [round((later - earlier) * 1000) for earlier, later in zip(times, times[1:])]
+    durations = [min(max(gap, CLIP_MIN_FRAME_MS), CLIP_MAX_FRAME_MS) for gap in gaps + [CLIP_MAX_FRAME_MS]]
+    images[0].save(path, format="GIF" if clip_format == CLIP_GIF else "PNG", save_all=True,
+                   append_images=images[1:], duration=durations, loop=0)
+    return path
+
+class ClipRecorder:
+    """Keep recent frames of a target and save a short clip around each alert.
+
+    add() is called with every captured frame; mark() flags the frame added
+    last as an alert. Once post frames have followed it, the pre frames
+    before it through the post frames after it are copied out of the ring
+    and saved on a background thread (clips/<target>/<time>.gif) with the
+    changed boxes outlined from the alert on. close() saves clips that are
+    still waiting for frames with what is there. A recorder with neither
+    pre nor post frames records nothing.
+    """
+
+    def __init__(self, name, pre=CLIP_PRE_FRAMES, post=CLIP_POST_FRAMES, directory=CLIP_DIR,
+                 clip_format=CLIP_GIF, on_clip=None):
+        self.name = name
+        self.pre = pre
+        self.post = post
+        self.directory = directory
+        self.clip_format = clip_format
+        self.on_clip = on_clip
+        self.enabled = bool(pre or post)
+        self.ring = MappedFrameRing(pre + post + 1) if self.enabled else None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, frame, when=None):
+        """Store a captured frame and save the clips it completes."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.ring.push(frame, when)
+            ready = [item for item in self._pending if item[0] + self.post < self.ring.seq]
+            self._pending = [item for item in self._pending if item[0] + self.post >= self.ring.seq]
+            clips = [self._collect(*item) for item in ready]
+        for clip in clips:
+            threading.Thread(target=self._save, args=clip, daemon=True).start()
+
+    def mark(self, boxes=None, when=None):
+        """Flag the last added frame as an alert with these changed boxes."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.ring.seq:
+                self._pending.append((self.ring.seq - 1, list(boxes or []), when or datetime.now()))
+
+    def _collect(self, seq, boxes, when):
+        frames, times = [], []
+        marked_from = 0
+        for index in range(seq - self.pre, seq + self.post + 1):
+            item = self.ring.get(index)
+            if item is None:
+                continue
+            if index == seq:
+                marked_from = len(frames)
+            times.append(item[0])
+            frames.append(np.array(item[1]))
+        return frames, times, marked_from, boxes, when
+
+    def _save(self, frames, times, marked_from, boxes, when):
+        if not frames:
+            return
+        directory = os.path.join(self.directory, safe_filename(self.name))
+        path = os.path.join(directory, f"{when.strftime('%Y%m%d-%H%M%S-%f')}.{self.clip_format}")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            save_clip(frames, times, marked_from, boxes, path, self.clip_format)
+        except Exception as e:
+            print(f"Error saving clip for {self.name}: {e}")
+            return
+        print(f"Saved clip of {self.name} to {path}")
+        if self.on_clip:
+            self.on_clip(self.name, path)
+
+    def close(self):
+        """Save the clips still waiting for frames, then release the ring."""
+        if not self.enabled:
+            return
+        with self._lock:
+            clips = [self._collect(*item) for item in self._pending]
+            self._pending = []
+        for clip in clips:
+            self._save(*clip)
+        with self._lock:
+            self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,217 @@
+import os
+import json
+import threading
+from clips import CLIP_FORMATS
+from diff_engine import COMPARE_MODES
+
+TELEGRAM_CONFIG_FILE = 'telegram_config.json'
+ALERT_SETTINGS_FILE = 'alert_settings.json'
+WATCH_TARGETS_FILE = 'watch_targets.json'
+TELEGRAM_STATE_FILE = 'telegram_state.json'
+
+# How often (seconds) the watcher thread checks the files for changes
+RELOAD_CHECK_INTERVAL = 2.0
+
+DEFAULT_ALERT_SETTINGS = {
+    'min_change_percent': 5,
+    'cooldown_period': 60,
+    'notification_sound': True,
+    'telegram_alerts': True,
+    'desktop_notifications': True,
+    'continuous_monitoring': False,
+    'perceptual_prefilter': False,
+    'adaptive_thresholds': False,
+    'diff_processes': 0,
+    'compare_mode': 'rgb',
+    'metrics_port': 0,
+    'history_enabled': False,
+    'clip_frames': 0,
+    'clip_format': 'gif'
+}
+
+# Alert settings that must be one of a fixed set of values
+ALERT_SETTING_CHOICES = {
+    'compare_mode': tuple(COMPARE_MODES),
+    'clip_format': CLIP_FORMATS
+}
+
+def _same_kind(value, default):
+    # bool is an int subclass; numbers may be written as ints or floats
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    return isinstance(value, type(default))
+
+def validate_alert_settings(settings):
+    """Replace wrongly typed, negative or unknown alert settings with their defaults."""
+    settings = dict(settings)
+    for key, default in DEFAULT_ALERT_SETTINGS.items():
+        value = settings.get(key)
+        if not _same_kind(value, default) or value not in ALERT_SETTING_CHOICES.get(key, (value,)):
+            print(f"Invalid alert setting {key}={value!r}, using {default!r}")
+            settings[key] = default
+    return settings
+
+def validate_watch_targets(data):
+    """Drop saved watch targets whose settings cannot be used."""
+    targets = data.get('targets') if isinstance(data, dict) else None
+    if not isinstance(targets, list):
+        print("Invalid watch targets file, ignoring it")
+        return {'targets': []}
+    valid = []
+    for spec in targets:
+        try:
+            if not isinstance(spec['name'], str) or not isinstance(spec['window_title'], str):
+                raise ValueError("name and window_title must be text")
+            for key in ('interval', 'max_interval', 'threshold'):
+                if not _same_kind(spec[key], 0.0):
+                    raise ValueError(f"{key} must be a non-negative number")
+            for key in ('min_change_percent', 'min_tile_size', 'clip_frames'):
+                if key in spec and not _same_kind(spec[key], 0):
+                    raise ValueError(f"{key} must be a non-negative number")
+            if spec.get('compare_mode', 'rgb') not in COMPARE_MODES:
+                raise ValueError(f"unknown compare_mode {spec['compare_mode']!r}")
+            if spec.get('clip_format', 'gif') not in CLIP_FORMATS:
+                raise ValueError(f"unknown clip_format {spec['clip_format']!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping invalid watch target {spec!r}: {e}")
+            continue
+        valid.append(spec)
+    return {**data, 'targets': valid}
+
+class ConfigFile:
+    """One JSON settings file, parsed once and cached in memory.
+
+    validate(data), if given, cleans every loaded copy so bad hand edits
+    fall back to defaults instead of failing where the value is used.
+    """
+
+    def __init__(self, path, defaults=None, validate=None):
+        self.path = path
+        self.defaults = defaults
+        self.validate = validate
+        self._data = None
+        self._mtime = None
+        self._loaded = False
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self):
+        """(Re)read the file from disk, falling back to the defaults."""
+        self._mtime = self._stat()
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if self.defaults is not None:
+                data = {**self.defaults, **data}
+        except FileNotFoundError:
+            data = dict(self.defaults) if self.defaults is not None else None
+        except (ValueError, TypeError) as e:
+            # Keep the last good copy if the file is half-written or invalid (TypeError: not an object)
+            print(f"Error reading {self.path}: {e}")
+            if self._loaded:
+                return
+            data = dict(self.defaults) if self.defaults is not None else None
+        if data is not None and self.validate is not None:
+            data = self.validate(data)
+        self._data = data
+        self._loaded = True
+
+    def get(self):
+        if not self._loaded:
+            self.load()
+        return self._data
+
+    def changed_on_disk(self):
+        return self._stat() != self._mtime
+
+    def save(self, data):
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        self.load()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.load()
+
+class ConfigStore:
+    """Cached, hot-reloadable view of the app's JSON settings files.
+
+    Readers get the in-memory copy without touching the filesystem. A
+    background thread checks the files' modification times every
+    RELOAD_CHECK_INTERVAL seconds and reloads any that changed, then calls
+    the registered listeners with the name of the section that changed.
+    """
+
+    def __init__(self, files, interval=RELOAD_CHECK_INTERVAL):
+        self.files = files
+        self.interval = interval
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, name):
+        """Return the cached settings for a section (a dict, or None if missing)."""
+        with self._lock:
+            return self.files[name].get()
+
+    def save(self, name, data):
+        with self._lock:
+            self.files[name].save(data)
+        self._notify(name)
+
+    def remove(self, name):
+        with self._lock:
+            self.files[name].remove()
+        self._notify(name)
+
+    def add_listener(self, callback):
+        """Register callback(name) to be called after a section changes."""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Start watching the files for external edits."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reload_changed(self):
+        """Reload every file whose modification time changed; returns their names."""
+        changed = []
+        with self._lock:
+            for name, config_file in self.files.items():
+                if config_file.changed_on_disk():
+                    config_file.load()
+                    changed.append(name)
+        for name in changed:
+            self._notify(name)
+        return changed
+
+    def _notify(self, name):
+        for callback in self.listeners:
+            try:
+                callback(name)
+            except Exception as e:
+                print(f"Error applying {name} settings: {e}")
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.reload_changed()
+
+# Shared store used by the GUI, the daemon and the Telegram client
+store = ConfigStore({
+    'telegram': ConfigFile(TELEGRAM_CONFIG_FILE),
+    'alerts': ConfigFile(ALERT_SETTINGS_FILE, DEFAULT_ALERT_SETTINGS, validate_alert_settings),
+    'targets': ConfigFile(WATCH_TARGETS_FILE, {'targets': []}, validate_watch_targets),
+    'telegram_state': ConfigFile(TELEGRAM_STATE_FILE, {'update_offset': None})
+})
@@ -0,0 +1,550 @@
+import math
+import numpy as np
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+# Default comparison settings used by the monitoring loop
+TILE_SIZE = 100
+CHANGE_THRESHOLD = 10
+# Smallest box the coarse-to-fine search refines changed tiles down to
+MIN_TILE_SIZE = 20
+# The coarse level of the coarse-to-fine search sums the difference over blocks of COARSE_FACTOR x COARSE_FACTOR pixels
+COARSE_FACTOR = 4
+
+# Comparison modes, mapped to the factor frames are downsampled by
+COMPARE_RGB = "rgb"
+COMPARE_LUMA = "luma"
+COMPARE_LUMA_2X = "luma2x"
+COMPARE_LUMA_4X = "luma4x"
+COMPARE_MODES = {COMPARE_RGB: 1, COMPARE_LUMA: 1, COMPARE_LUMA_2X: 2, COMPARE_LUMA_4X: 4}
+
+def image_to_array(image):
+    """Convert a PIL image (or an existing array) into an HxWxC uint8 array."""
+    array = np.asarray(image, dtype=np.uint8)
+    if array.ndim == 2:
+        array = array[:, :, np.newaxis]
+    return array
+
+def frame_luma(frame, factor=1):
+    """Return the HxWx1 Rec. 601 luma of an RGB frame, box-filtered by factor.
+
+    Integer weights (77, 150, 29)/256 avoid a float pass. For factor > 1
+    the rows of each block are summed first (contiguous, cheap), the luma is
+    taken of those sums and the columns are summed last, so the per-pixel
+    work is done on 1/factor of the frame. Edges that don't fill a block are
+    padded by repeating the last row or column.
+    """
+    array = image_to_array(frame)
+    if array.shape[2] == 1 and factor == 1:
+        return array
+    height, width, channels = array.shape
+    if channels != 3:
+        raise ValueError("Luma needs an RGB frame")
+    if height % factor or width % factor:
+        array = np.pad(array, ((0, -height % factor), (0, -width % factor), (0, 0)), mode="edge")
+        height, width = array.shape[:2]
+
+    if factor == 1:
+        # Full resolution: 77 + 150 + 29 = 256, so 16 bits are enough
+        flat = np.ascontiguousarray(array).reshape(-1)
+        luma = np.multiply(flat[0::3], 77, dtype=np.uint16)
+        term = np.multiply(flat[1::3], 150, dtype=np.uint16)
+        luma += term
+        np.multiply(flat[2::3], 29, out=term, dtype=np.uint16)
+        luma += term
+        luma += 128
+        luma >>= 8
+        return luma.astype(np.uint8).reshape(height, width, 1)
+
+    rows = np.ascontiguousarray(array).reshape(height // factor, factor, width * 3)
+    sums = rows[:, 0].astype(np.uint16)
+    for row in range(1, factor):
+        sums += rows[:, row]
+    flat = sums.reshape(-1)
+    luma = flat[0::3] * np.uint32(77)
+    luma += flat[1::3] * np.uint32(150)
+    luma += flat[2::3] * np.uint32(29)
+    columns = luma.reshape(-1, factor)
+    block = columns[:, 0].copy()
+    for column in range(1, factor):
+        block += columns[:, column]
+    scale = factor * factor * 256
+    block += scale // 2
+    block //= scale
+    return block.astype(np.uint8).reshape(height // factor, width // factor, 1)
+
+class FramePreparer:
+    """Convert frames for a comparison mode and map results back to frame pixels.
+
+    COMPARE_RGB compares every channel at full resolution. COMPARE_LUMA
+    compares one luma channel, a third of the work; it misses colour changes
+    that keep the brightness. The downsampled modes also box-filter the luma
+    by 2x or 4x (a quarter or a sixteenth of the pixels), which evens out
+    changes smaller than a block. The threshold keeps its meaning in every
+    mode (mean difference per channel of a pixel) and tile sizes are scaled
+    with the frame, so each tile covers the same screen area. The last
+    prepared frame is kept, so when it becomes the next baseline it is not
+    converted again. Only that one frame is looked up: capture buffers are
+    reused, so an older array may hold new pixels by now.
+
+    Converting a frame costs about three quarters of a full-resolution RGB
+    diff in COMPARE_LUMA and about half in the 4x mode, so the modes pay off
+    in the later passes (diff, fingerprint, noise model, shared memory
+    copies) rather than up front. Callers check the raw grab for an
+    identical frame before preparing it, so a static page pays for no
+    conversion. On a full repaint, merging the changed cells into regions
+    dominates and the 4x mode saves only about a quarter to a third of the
+    time of COMPARE_RGB.
+    """
+
+    def __init__(self, mode=COMPARE_RGB):
+        if mode not in COMPARE_MODES:
+            raise ValueError(f"Unknown comparison mode: {mode}")
+        self.mode = mode
+        self.scale = COMPARE_MODES[mode]
+        self._last = None
+
+    def prepare(self, frame):
+        """Return the frame as compared in this mode."""
+        if self.mode == COMPARE_RGB:
+            return frame
+        if self._last is not None and self._last[0] is frame:
+            return self._last[1]
+        prepared = frame_luma(frame, self.scale)
+        self._last = (frame, prepared)
+        return prepared
+
+    def reuse(self, previous, frame):
+        """Let a frame found identical to the last prepared one (previous) share its conversion."""
+        if self._last is not None and self._last[0] is previous:
+            self._last = (frame, self._last[1])
+
+    def tile_size(self, size):
+        """Scale a tile or cell size (in frame pixels) to the prepared frame."""
+        return max(1, size // self.scale)
+
+    def to_prepared(self, rects):
+        """Scale frame rectangles down, growing them to whole prepared pixels."""
+        scale = self.scale
+        return [(left // scale, top // scale, -(-right // scale), -(-bottom // scale))
+                for left, top, right, bottom in rects]
+
+    def to_frame(self, boxes, width, height):
+        """Scale prepared boxes back up to frame pixels, clipped to the frame."""
+        scale = self.scale
+        return [(left * scale, top * scale, min(right * scale, width), min(bottom * scale, height))
+                for left, top, right, bottom in boxes]
+
+    def regions_to_frame(self, regions, width, height):
+        """Scale change_regions() results back up to frame pixels."""
+        if self.scale == 1:
+            return regions
+        return [dict(region, box=self.to_frame([region["box"]], width, height)[0],
+                     area=region["area"] * self.scale * self.scale) for region in regions]
+
+def divide_image_into_tiles(image, tile_size):
+    """Divide the screenshot into smaller tiles (regions) for more granular comparison."""
+    tiles = []
+    width, height = image.size
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            box = (x, y, min(x + tile_size, width), min(y + tile_size, height))
+            tiles.append((box, image.crop(box)))
+    return tiles
+
+def calculate_image_difference(img1, img2):
+    """Calculate the visual difference between two images."""
+    try:
+        diff = ImageChops.difference(img1, img2)
+        stat = ImageStat.Stat(diff)
+        diff_mean = sum(stat.mean) / len(stat.mean)  # Average difference in pixel values
+        return diff_mean
+    except Exception as e:
+        print(f"Error calculating image difference: {e}")
+        return 0
+
+def tile_edges(length, tile_size):
+    """Return the start offsets of the tiles along one axis."""
+    return np.arange(0, length, tile_size)
+
+def tile_boxes(width, height, tile_size):
+    """Return the (left, top, right, bottom) box of every tile in row-major order."""
+    boxes = []
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            boxes.append((x, y, min(x + tile_size, width), min(y + tile_size, height)))
+    return boxes
+
+def tile_difference_sums(img1, img2, tile_size=TILE_SIZE):
+    """Sum the absolute pixel difference of every tile in a single pass.
+
+    Returns (sums, counts): (rows, cols) arrays of the summed channel
+    differences and of the number of channel values in each tile.
+    """
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+
+    # Compare the overlapping region if the window was resized between frames
+    if a.shape != b.shape:
+        height = min(a.shape[0], b.shape[0])
+        width = min(a.shape[1], b.shape[1])
+        a = a[:height, :width]
+        b = b[:height, :width]
+
+    height, width, channels = a.shape
+    if height == 0 or width == 0:
+        return np.zeros((0, 0), dtype=np.uint32), np.zeros((0, 0), dtype=np.int64)
+
+    # Absolute difference without leaving uint8
+    diff = np.maximum(a, b)
+    diff -= np.minimum(a, b)
+    rows = diff.reshape(height, width * channels)
+
+    # Sum each band of tile_size rows, then each run of tile_size pixels in a band
+    full_rows = height // tile_size
+    bands = [rows[:full_rows * tile_size].reshape(full_rows, tile_size, width * channels).sum(axis=1, dtype=np.uint32)]
+    if height % tile_size:
+        bands.append(rows[full_rows * tile_size:].sum(axis=0, dtype=np.uint32)[np.newaxis])
+    band_sums = np.concatenate(bands)
+    tile_sums = np.add.reduceat(band_sums, tile_edges(width, tile_size) * channels, axis=1)
+
+    # Edge tiles may be smaller than tile_size, so count their real area
+    tile_heights = np.diff(np.append(tile_edges(height, tile_size), height))
+    tile_widths = np.diff(np.append(tile_edges(width, tile_size), width))
+    return tile_sums, np.outer(tile_heights, tile_widths) * channels
+
+def tile_difference_means(img1, img2, tile_size=TILE_SIZE):
+    """Calculate the mean pixel difference of every tile in a single pass.
+
+    Returns a (rows, cols) float array where each entry matches what
+    calculate_image_difference() reports for the corresponding tile pair.
+    """
+    sums, counts = tile_difference_sums(img1, img2, tile_size)
+    if sums.size == 0:
+        return np.zeros((0, 0), dtype=np.float64)
+    return sums / counts
+
+def changed_pixel_ratio(img1, img2, min_percent=0, threshold=CHANGE_THRESHOLD, ignored=None, band_rows=64):
+    """Measure how much of the image changed, giving up once min_percent is out of reach.
+
+    A pixel counts as changed when its mean channel difference exceeds the
+    threshold. Rows are scanned in bands and the scan stops early once
+    min_percent can no longer be reached with the rows that are left; with
+    min_percent None every row is counted and reached means any pixel
+    changed. Pixels set in the optional (height, width) ignored mask are
+    left out. Returns (reached, percent); when reached, percent is the exact
+    changed share of the image (it is reported with the alert), otherwise
+    it may only cover the rows scanned before giving up.
+    """
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    total = height * width
+    if ignored is not None:
+        total -= int(np.count_nonzero(ignored[:height, :width]))
+    if total == 0:
+        return False, 0.0
+
+    # At least one pixel must change, even with a 0% minimum
+    needed = max(1, int(np.ceil(total * min_percent / 100))) if min_percent is not None else None
+    limit = threshold * a.shape[2]
+    changed = 0
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        band_a = a[top:bottom, :width]
+        band_b = b[top:bottom, :width]
+        diff = np.maximum(band_a, band_b)
+        diff -= np.minimum(band_a, band_b)
+
+        # Summing channel planes is much faster than a reduction over the last axis
+        channel_sum = diff[:, :, 0].astype(np.uint16)
+        for channel in range(1, diff.shape[2]):
+            channel_sum += diff[:, :, channel]
+        if ignored is not None:
+            channel_sum[ignored[top:bottom, :width]] = 0
+        changed += np.count_nonzero(channel_sum > limit)
+
+        if needed is not None and changed + (height - bottom) * width < needed:
+            break
+    return changed >= (needed or 1), float(changed * 100 / total)
+
+def find_changed_tiles(img1, img2, tile_size=TILE_SIZE, threshold=CHANGE_THRESHOLD):
+    """Compare two images tile by tile.
+
+    Returns a tuple of (mask, boxes) where mask is a (rows, cols) boolean
+    array of tiles whose mean difference exceeds the threshold and boxes is
+    the list of (left, top, right, bottom) boxes of those tiles.
+    """
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+
+    mask = tile_difference_means(a, b, tile_size) > threshold
+    boxes = [
+        (col * tile_size, row * tile_size,
+         min((col + 1) * tile_size, width), min((row + 1) * tile_size, height))
+        for row, col in zip(*(axis.tolist() for axis in np.nonzero(mask)))
+    ]
+    return mask, boxes
+
+def detect_changes(img1, img2, tile_size=TILE_SIZE, threshold=CHANGE_THRESHOLD, min_percent=0,
+                   candidates=None, min_tile_size=None, ignore=None):
+    """Decide whether a frame changed enough to alert.
+
+    A tile changes when its mean difference exceeds the threshold, and an
+    alert also needs at least min_percent of the pixels (and at least one)
+    to have changed. With a min_tile_size smaller than tile_size the
+    coarse-to-fine search in localize_changes() applies the same test and
+    reports the changed tiles as min_tile_size cells. Otherwise the
+    changed_pixel_ratio() check runs first and the changed tiles are only
+    located when it passes. When a (rows, cols) candidates mask is given,
+    only those tiles are compared and every other tile is treated as
+    unchanged. An IgnoreMask (see masks.py) always goes through
+    localize_changes().
+    Returns (boxes, percent); boxes is empty when no alert should fire.
+    """
+    if ignore or (min_tile_size and min_tile_size < tile_size):
+        return localize_changes(img1, img2, tile_size, min(min_tile_size or tile_size, tile_size),
+                                threshold, min_percent, candidates, ignore)
+
+    if candidates is not None and not candidates.all():
+        return _detect_in_tiles(img1, img2, tile_size, threshold, min_percent, candidates)
+
+    reached, percent = changed_pixel_ratio(img1, img2, min_percent, threshold)
+    if not reached:
+        return [], percent
+    _, boxes = find_changed_tiles(img1, img2, tile_size, threshold)
+    return boxes, percent
+
+def localize_changes(img1, img2, tile_size=TILE_SIZE, min_tile_size=MIN_TILE_SIZE,
+                     threshold=CHANGE_THRESHOLD, min_percent=0, candidates=None, ignore=None):
+    """Locate changed tiles coarse-to-fine and return tight boxes inside them.
+
+    A tile changes, as in find_changed_tiles(), when its mean difference
+    exceeds the threshold. The coarse level sums the absolute difference
+    over blocks of COARSE_FACTOR x COARSE_FACTOR pixels, so every pixel
+    counts and nothing cancels out: tile means come exactly from the
+    blocks. Inside the tiles that pass, the cells of a min_tile_size grid
+    holding at least one changed pixel's worth of difference
+    (threshold * channels) are reported, so an edit yields a small box
+    instead of a whole tile. The alert still needs min_percent of
+    the pixels to have changed, checked with the changed_pixel_ratio()
+    scan as in detect_changes(). Pixels covered by the ignore mask are
+    never compared or counted. Returns (boxes, percent) like
+    detect_changes().
+    """
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    total = height * width
+    ignored, active, partial = None, None, None
+    if ignore:
+        ignored, active, partial, masked_pixels = ignore.layout(height, width, tile_size)
+        total -= masked_pixels
+    if total == 0:
+        return [], 0.0
+    channels = a.shape[2]
+    limit = threshold * channels
+
+    if active is not None:
+        candidates = active if candidates is None else candidates & active
+    grid = (-(-height // tile_size), -(-width // tile_size))
+    mask = np.ones(grid, dtype=bool) if candidates is None else candidates
+    if not mask.any():
+        return [], 0.0
+
+    # Blocks must tile both the tile and the cell grid
+    factor = math.gcd(math.gcd(tile_size, min_tile_size), COARSE_FACTOR)
+    # Difference per cell of one min_tile_size grid for the whole frame, so neighbouring tiles share it
+    cell_sums = np.zeros((-(-height // min_tile_size), -(-width // min_tile_size)), dtype=np.uint64)
+    passed = False
+    for row in np.nonzero(mask.any(axis=1))[0].tolist():
+        cols = np.nonzero(mask[row])[0]
+        top, bottom = row * tile_size, min((row + 1) * tile_size, height)
+        left, right = int(cols[0]) * tile_size, min((int(cols[-1]) + 1) * tile_size, width)
+        band_a = a[top:bottom, left:right]
+        band_b = b[top:bottom, left:right]
+        diff = np.maximum(band_a, band_b)
+        diff -= np.minimum(band_a, band_b)
+
+        edges = tile_edges(right - left, tile_size)
+        widths = np.diff(np.append(edges, right - left))
+        areas = (bottom - top) * widths
+        if partial is not None and partial[row, cols[0]:cols[-1] + 1].any():
+            band_ignored = ignored[top:bottom, left:right]
+            diff[band_ignored] = 0
+            areas = areas - np.add.reduceat(band_ignored.sum(axis=0), edges)
+
+        # Coarse level: the difference of every block, from which the tile means below are exact
+        blocks = _block_sums(diff, factor)
+        block_edges = edges // factor
+        sums = np.add.reduceat(blocks.sum(axis=0, dtype=np.uint64), block_edges)
+        gated = (sums > threshold * channels * areas) & mask[row, cols[0]:cols[-1] + 1]
+        if not gated.any():
+            continue
+
+        # Cells add up only the blocks of tiles that passed
+        blocks[:, ~np.repeat(gated, np.diff(np.append(block_edges, blocks.shape[1])))] = 0
+        row_cuts = _grid_cuts(top, bottom, min_tile_size)
+        col_cuts = _grid_cuts(left, right, min_tile_size)
+        first_row, first_col = top // min_tile_size, left // min_tile_size
+        cell_sums[first_row:first_row + len(row_cuts), first_col:first_col + len(col_cuts)] += \
+            np.add.reduceat(np.add.reduceat(blocks, row_cuts // factor, axis=0), col_cuts // factor, axis=1)
+        passed = True
+    if not passed:
+        return [], 0.0
+
+    reached, percent = changed_pixel_ratio(a, b, min_percent, threshold, ignored)
+    if not reached:
+        return [], percent
+
+    # A cell is reported when it holds at least one changed pixel's worth of difference
+    rows, cols = np.nonzero(cell_sums > limit)
+    lefts = cols * min_tile_size
+    tops = rows * min_tile_size
+    boxes = list(zip(lefts.tolist(), tops.tolist(), np.minimum(lefts + min_tile_size, width).tolist(),
+                     np.minimum(tops + min_tile_size, height).tolist()))
+    return boxes, percent
+
+def _block_sums(diff, factor):
+    """Sum a band's difference over the channels of every factor x factor block (partial blocks at the edges)."""
+    height, width, channels = diff.shape
+    flat = diff.reshape(height, width * channels)
+    # Rows of each block first (contiguous, cheap), then the columns of the much smaller result
+    rows = np.stack([flat[start:start + factor].sum(axis=0, dtype=np.uint16) for start in range(0, height, factor)])
+    if width % factor == 0:
+        return rows.reshape(len(rows), width // factor, factor * channels).sum(axis=2, dtype=np.uint16)
+    return np.add.reduceat(rows, np.arange(0, width * channels, factor * channels), axis=1)
+
+def _grid_cuts(start, stop, cell_size):
+    """Offsets from start where [start, stop) crosses lines of a global cell_size grid, plus 0."""
+    first = -(-start // cell_size) * cell_size
+    lines = np.arange(first if first > start else first + cell_size, stop, cell_size)
+    return np.concatenate(([0], lines - start)).astype(np.intp)
+
+def _detect_in_tiles(img1, img2, tile_size, threshold, min_percent, candidates):
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    limit = threshold * a.shape[2]
+
+    boxes = []
+    changed = 0
+    for row, col in zip(*(axis.tolist() for axis in np.nonzero(candidates))):
+        box = (col * tile_size, row * tile_size,
+               min((col + 1) * tile_size, width), min((row + 1) * tile_size, height))
+        tile_a = a[box[1]:box[3], box[0]:box[2]]
+        tile_b = b[box[1]:box[3], box[0]:box[2]]
+        if tile_a.size == 0:
+            continue
+        diff = np.maximum(tile_a, tile_b)
+        diff -= np.minimum(tile_a, tile_b)
+        channel_sum = diff.sum(axis=2, dtype=np.uint16)
+        changed += np.count_nonzero(channel_sum > limit)
+        if channel_sum.mean() / a.shape[2] > threshold:
+            boxes.append(box)
+
+    percent = float(changed * 100 / (height * width)) if height and width else 0.0
+    if not changed or percent < min_percent:
+        return [], percent
+    return boxes, percent
+
+def label_regions(boxes, cell_size=TILE_SIZE):
+    """Group boxes into connected components with a union-find pass.
+
+    Boxes that touch along an edge or at a corner, or overlap, end up in the
+    same component. Boxes are filed under the cell_size grid cells they
+    cover so only boxes in the same or neighbouring cells are compared, but
+    adjacency is decided on the box coordinates themselves, so boxes need
+    not line up with that grid. Returns a list of components, each a list
+    of boxes.
+    """
+    cells = {}
+    for index, (left, top, right, bottom) in enumerate(boxes):
+        for row in range(top // cell_size, max(top, bottom - 1) // cell_size + 1):
+            for col in range(left // cell_size, max(left, right - 1) // cell_size + 1):
+                cells.setdefault((row, col), []).append(index)
+    parent = list(range(len(boxes)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def join(index, other):
+        root, other_root = find(index), find(other)
+        if root == other_root:
+            return
+        left, top, right, bottom = boxes[index]
+        other_left, other_top, other_right, other_bottom = boxes[other]
+        if left <= other_right and other_left <= right and top <= other_bottom and other_top <= bottom:
+            parent[other_root] = root
+
+    # Touching boxes lie in the same or adjacent cells; looking back at four
+    # neighbours (and within the cell) is enough to cover all eight directions
+    for (row, col), members in cells.items():
+        for position in range(1, len(members)):
+            for index in members[:position]:
+                join(index, members[position])
+        for neighbour in ((row, col - 1), (row - 1, col - 1), (row - 1, col), (row - 1, col + 1)):
+            others = cells.get(neighbour)
+            if others is not None:
+                for other in others:
+                    for index in members:
+                        join(index, other)
+
+    components = {}
+    for index, box in enumerate(boxes):
+        components.setdefault(find(index), []).append(box)
+    return list(components.values())
+
+def change_regions(img1, img2, boxes, cell_size=TILE_SIZE):
+    """Merge changed boxes into connected regions and describe each one.
+
+    Returns a list of dicts, largest first, with the region's bounding
+    "box", its changed "area" in pixels (the sum of its cells), the number
+    of "cells" merged into it and the mean channel difference ("intensity")
+    over those cells.
+    """
+    a = image_to_array(img1)
+    b = image_to_array(img2)
+    regions = []
+    for component in label_regions(boxes, cell_size):
+        total = 0
+        area = 0
+        for left, top, right, bottom in component:
+            tile_a = a[top:bottom, left:right]
+            tile_b = b[top:bottom, left:right]
+            diff = np.maximum(tile_a, tile_b)
+            diff -= np.minimum(tile_a, tile_b)
+            total += int(diff.sum(dtype=np.uint64))
+            area += (right - left) * (bottom - top)
+        regions.append({
+            "box": (min(box[0] for box in component), min(box[1] for box in component),
+                    max(box[2] for box in component), max(box[3] for box in component)),
+            "area": area,
+            "cells": len(component),
+            "intensity": total / (area * a.shape[2]) if area else 0.0
+        })
+    regions.sort(key=lambda region: region["area"], reverse=True)
+    return regions
+
+def describe_regions(regions):
+    """Summarise change regions in one line for logs and alert captions."""
+    if not regions:
+        return "no changed regions"
+    left, top, right, bottom = regions[0]["box"]
+    count = f"{len(regions)} changed region" + ("s" if len(regions) != 1 else "")
+    return f"{count}, largest {right - left}x{bottom - top} at ({left}, {top})"
+
+def render_overlay(frame, boxes, outline="red", width=3):
+    """Return a PIL copy of the frame with a rectangle drawn around each box."""
+    overlay_image = Image.fromarray(np.ascontiguousarray(frame)) if isinstance(frame, np.ndarray) else frame.copy()
+    draw = ImageDraw.Draw(overlay_image)
+    for box in boxes:
+        draw.rectangle(box, outline=outline, width=width)
+    return overlay_image
@@ -0,0 +1,130 @@
+import math
+import zlib
+import numpy as np
+from diff_engine import TILE_SIZE, image_to_array
+
+# Side of the square cells averaged into one perceptual hash bit (pixels)
+HASH_CELL_SIZE = 10
+
+def frame_hash(frame):
+    """Fingerprint the raw pixel buffer of a frame for exact-equality checks.
+
+    An RGB view into a capture buffer is hashed through its contiguous BGRA
+    source instead of being copied. The source may hold more than the view,
+    so equal hashes still mean equal frames.
+    """
+    array = image_to_array(frame)
+    source = array.base
+    if not array.flags.c_contiguous and isinstance(source, np.ndarray) and source.flags.c_contiguous:
+        return (array.shape, source.size, zlib.crc32(source))
+    return (array.shape, zlib.crc32(np.ascontiguousarray(array)))
+
+def tile_signatures(frame, tile_size=TILE_SIZE, cell_size=HASH_CELL_SIZE):
+    """Compute a downscaled average hash for every tile in one pass.
+
+    Each tile is split into cells of cell_size pixels; a cell's bit is set
+    when its brightness is above the tile's mean. Returns a boolean array of
+    shape (rows, cols, cells, cells).
+    """
+    array = image_to_array(frame)
+    height, width = array.shape[:2]
+    cell_size = math.gcd(tile_size, cell_size)
+    cells = tile_size // cell_size
+
+    # Brightness per cell: sum the channel planes, then block-sum the cell grid
+    gray = array[:, :, 0].astype(np.uint32)
+    for channel in range(1, array.shape[2]):
+        gray += array[:, :, channel]
+    grid = np.add.reduceat(np.add.reduceat(gray, np.arange(0, height, cell_size), axis=0),
+                           np.arange(0, width, cell_size), axis=1).astype(np.float32)
+
+    # Pad the (small) cell grid to whole tiles so it can be reshaped per tile
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    grid = np.pad(grid, ((0, rows * cells - grid.shape[0]), (0, cols * cells - grid.shape[1])))
+    per_tile = grid.reshape(rows, cells, cols, cells).transpose(0, 2, 1, 3)
+    return per_tile > per_tile.mean(axis=(2, 3), keepdims=True)
+
+class FramePrefilter:
+    """Cheap fingerprint stage that runs before the full tile comparison.
+
+    check() returns None when the frame is byte-for-byte identical to the
+    previous one (no diff needed at all). Otherwise it returns a boolean
+    (rows, cols) mask of tiles worth diffing: every tile, or with perceptual
+    hashing enabled only the tiles whose average hash changed. Perceptual
+    hashing is lossy (a tiny change may not flip any bit), so it is opt-in.
+    The two steps are also available as identical() and candidates(), so
+    the exact check can run on the raw capture before the frame is
+    converted for comparison. Counters track how much work was skipped.
+    """
+
+    def __init__(self, tile_size=TILE_SIZE, perceptual=False):
+        self.tile_size = tile_size
+        self.perceptual = perceptual
+        self._last_hash = None
+        self._last_signatures = None
+        self._last_tiles = 0
+
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.tiles_seen = 0
+        self.tiles_skipped = 0
+
+    def reset(self):
+        """Forget the previous frame (e.g. after the baseline was replaced)."""
+        self._last_hash = None
+        self._last_signatures = None
+
+    def check(self, frame):
+        """Fingerprint a frame; returns None to skip the diff or a mask of tiles to compare."""
+        if self.identical(frame):
+            return None
+        return self.candidates(frame)
+
+    def identical(self, frame):
+        """Return True (and count the frame as skipped) when it equals the previous one."""
+        self.frames_seen += 1
+        current_hash = frame_hash(frame)
+        previous_hash = self._last_hash
+        self._last_hash = current_hash
+        if current_hash != previous_hash:
+            return False
+        # Counted in the tiles of the last frame that was compared
+        self.frames_skipped += 1
+        self.tiles_seen += self._last_tiles
+        self.tiles_skipped += self._last_tiles
+        return True
+
+    def candidates(self, frame):
+        """Return the mask of tiles of a differing frame to compare, or None if none changed."""
+        array = image_to_array(frame)
+        rows = -(-array.shape[0] // self.tile_size)
+        cols = -(-array.shape[1] // self.tile_size)
+        self._last_tiles = rows * cols
+        self.tiles_seen += rows * cols
+        if not self.perceptual:
+            return np.ones((rows, cols), dtype=bool)
+
+        signatures = tile_signatures(array, self.tile_size)
+        previous = self._last_signatures
+        self._last_signatures = signatures
+        if previous is None or previous.shape != signatures.shape:
+            return np.ones((rows, cols), dtype=bool)
+
+        candidates = (signatures != previous).any(axis=(2, 3))
+        self.tiles_skipped += rows * cols - int(np.count_nonzero(candidates))
+        if not candidates.any():
+            self.frames_skipped += 1
+            return None
+        return candidates
+
+    def stats(self):
+        """Return the skip counters and rates."""
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_skipped": self.frames_skipped,
+            "frame_skip_rate": self.frames_skipped / self.frames_seen if self.frames_seen else 0.0,
+            "tiles_seen": self.tiles_seen,
+            "tiles_skipped": self.tiles_skipped,
+            "tile_skip_rate": self.tiles_skipped / self.tiles_seen if self.tiles_seen else 0.0
+        }
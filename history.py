@@ -0,0 +1,348 @@
+"""On-disk change history: a keyframe plus the changed tiles of every event.
+
+Each target gets a directory under the history root:
+
+    index.jsonl     one JSON record per event, in time order
+    tiles.pack      zlib-compressed tiles, appended once per distinct tile
+    keyframes/      full frames as PNG, one per keyframe record
+
+A record either is a keyframe or lists the tiles that differ from the
+frame recorded before it, so any past frame is rebuilt from its keyframe
+plus at most KEYFRAME_INTERVAL deltas. Tiles are stored once per content
+hash, so content that flips back and forth (a blinking badge, a rotating
+banner) costs nothing after the first time.
+
+    python history.py <history dir> <target> [--at TIME] [--output frame.png]
+
+lists a target's events, or rebuilds the frame shown at TIME (an ISO date
+or a Unix timestamp) and saves it as a PNG.
+"""
+import os
+import sys
+import json
+import zlib
+import bisect
+import hashlib
+import argparse
+import threading
+import queue
+from datetime import datetime
+import numpy as np
+from PIL import Image
+from diff_engine import TILE_SIZE, image_to_array, tile_edges
+
+# Default directory histories are kept in
+HISTORY_DIR = "history"
+# Deltas recorded after a keyframe before the next full frame is stored
+KEYFRAME_INTERVAL = 50
+# A frame with at least this share of its tiles changed is stored as a keyframe
+KEYFRAME_FRACTION = 0.5
+TILE_COMPRESSION = 6
+# Change events waiting for the writer thread before new ones are dropped
+HISTORY_QUEUE_SIZE = 32
+
+def safe_filename(name):
+    """Turn a target name into something usable as a file or directory name."""
+    return "".join(char if char.isalnum() or char in "-_." else "_" for char in name).strip(".") or "target"
+
+def history_dir(root, name):
+    """Return the directory a target's history is kept in."""
+    return os.path.join(root, safe_filename(name))
+
+def changed_tiles(previous, frame, tile_size):
+    """Return the (row, col) of every tile whose pixels differ at all between two frames."""
+    height, width = frame.shape[:2]
+    differs = (previous != frame).any(axis=2)
+    counts = np.add.reduceat(np.add.reduceat(differs, tile_edges(height, tile_size), axis=0, dtype=np.uint32),
+                             tile_edges(width, tile_size), axis=1)
+    return list(zip(*(axis.tolist() for axis in np.nonzero(counts))))
+
+class ChangeHistory:
+    """Append-only history of one target's changed frames.
+
+    record() stores a frame; frame_at() rebuilds the frame recorded at or
+    before a time. Records are kept in memory as loaded from index.jsonl
+    (a few hundred bytes each), pixels stay on disk. Safe to share between
+    threads.
+    """
+
+    def __init__(self, path, tile_size=TILE_SIZE, keyframe_interval=KEYFRAME_INTERVAL,
+                 keyframe_fraction=KEYFRAME_FRACTION):
+        self.path = path
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.keyframe_fraction = keyframe_fraction
+        self.records = []
+        self._times = []
+        self._blobs = {}
+        self._lock = threading.Lock()
+        self._last = None
+        self._rebuilt = None
+        self._pack = None
+        os.makedirs(os.path.join(path, "keyframes"), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, "index.jsonl"), "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; everything before it is intact
+                        print(f"Skipping damaged history record in {self.path}")
+                        continue
+                    self.records.append(record)
+                    self._times.append(record["time"])
+                    self._blobs.update(record.get("blobs", {}))
+        except FileNotFoundError:
+            pass
+        if self.records:
+            # Tile sizes are per history; keep the one it was written with
+            self.tile_size = self.records[-1]["tile_size"]
+
+    def record(self, frame, when=None, boxes=None, percent=None):
+        """Append a frame to the history and return its record."""
+        array = image_to_array(frame)
+        when = when or datetime.now()
+        with self._lock:
+            seq = len(self.records)
+            record = {
+                "seq": seq,
+                "time": when.timestamp(),
+                "shape": list(array.shape),
+                "tile_size": self.tile_size,
+                "boxes": [list(box) for box in boxes or []],
+                "percent": percent
+            }
+
+            previous = self._last
+            if previous is None and seq:
+                # Reopened history: continue from the last frame on disk
+                previous = self._frame(seq - 1)
+            tiles = None
+            if previous is not None and previous.shape == array.shape:
+                last_key = self.records[-1]["key"]
+                if seq - last_key < self.keyframe_interval:
+                    tiles = changed_tiles(previous, array, self.tile_size)
+                    rows = -(-array.shape[0] // self.tile_size)
+                    cols = -(-array.shape[1] // self.tile_size)
+                    if len(tiles) >= self.keyframe_fraction * rows * cols:
+                        tiles = None
+
+            if tiles is None:
+                record["key"] = seq
+                Image.fromarray(array if array.shape[2] != 1 else array[:, :, 0]).save(self._keyframe_path(seq))
+            else:
+                record["key"] = self.records[-1]["key"]
+                record["tiles"], record["blobs"] = self._store_tiles(array, tiles)
+
+            with open(os.path.join(self.path, "index.jsonl"), "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.records.append(record)
+            self._times.append(record["time"])
+            self._last = array.copy()
+            return record
+
+    def _store_tiles(self, array, tiles):
+        size = self.tile_size
+        entries = []
+        blobs = {}
+        if self._pack is None:
+            self._pack = open(os.path.join(self.path, "tiles.pack"), "ab")
+        for row, col in tiles:
+            tile = np.ascontiguousarray(array[row * size:(row + 1) * size, col * size:(col + 1) * size])
+            digest = hashlib.blake2b(tile.tobytes(), digest_size=16, key=repr(tile.shape).encode()).hexdigest()
+            if digest not in self._blobs:
+                data = zlib.compress(tile.tobytes(), TILE_COMPRESSION)
+                self._pack.seek(0, os.SEEK_END)
+                blob = [self._pack.tell(), len(data), tile.shape[0], tile.shape[1]]
+                self._pack.write(data)
+                self._blobs[digest] = blobs[digest] = blob
+            entries.append([row, col, digest])
+        # The tiles must be on disk before the index refers to them
+        self._pack.flush()
+        return entries, blobs
+
+    def _keyframe_path(self, seq):
+        return os.path.join(self.path, "keyframes", f"{seq:08d}.png")
+
+    def _frame(self, seq):
+        """Rebuild the frame of record seq from its keyframe and the deltas after it."""
+        record = self.records[seq]
+        key = record["key"]
+        rebuilt = self._rebuilt
+        if rebuilt is not None and rebuilt[0] <= seq and self.records[rebuilt[0]]["key"] == key:
+            # Continue from the last rebuilt frame of the same keyframe run
+            start, frame = rebuilt[0] + 1, rebuilt[1].copy()
+        else:
+            with Image.open(self._keyframe_path(key)) as image:
+                frame = image_to_array(image).copy()
+            start = key + 1
+
+        deltas = self.records[start:seq + 1]
+        if deltas:
+            size = record["tile_size"]
+            with open(os.path.join(self.path, "tiles.pack"), "rb") as pack:
+                for delta in deltas:
+                    for row, col, digest in delta["tiles"]:
+                        offset, length, height, width = self._blobs[digest]
+                        pack.seek(offset)
+                        tile = np.frombuffer(zlib.decompress(pack.read(length)), dtype=np.uint8)
+                        frame[row * size:row * size + height, col * size:col * size + width] = \
+                            tile.reshape(height, width, frame.shape[2])
+        self._rebuilt = (seq, frame)
+        return frame
+
+    def frame(self, seq):
+        """Return a copy of the frame of record seq."""
+        with self._lock:
+            if self._pack is not None:
+                self._pack.flush()
+            return self._frame(seq).copy()
+
+    def find(self, when):
+        """Return the index of the last record at or before when (a datetime or timestamp), or None."""
+        timestamp = when.timestamp() if isinstance(when, datetime) else float(when)
+        with self._lock:
+            index = bisect.bisect_right(self._times, timestamp) - 1
+        return index if index >= 0 else None
+
+    def frame_at(self, when):
+        """Rebuild the frame that was current at when, or None before the first record."""
+        seq = self.find(when)
+        return self.frame(seq) if seq is not None else None
+
+    def stats(self):
+        """Return record counts and the storage used compared with full frames."""
+        with self._lock:
+            records = list(self.records)
+        stored = 0
+        for root, _, files in os.walk(self.path):
+            stored += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        raw = sum(int(np.prod(record["shape"])) for record in records)
+        return {
+            "records": len(records),
+            "keyframes": sum(1 for record in records if record["key"] == record["seq"]),
+            "stored_bytes": stored,
+            "raw_bytes": raw,
+            "ratio": stored / raw if raw else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._pack is not None:
+                self._pack.close()
+                self._pack = None
+
+class HistoryRecorder:
+    """Keep a ChangeHistory per target under one root directory.
+
+    record_event() only queues the event; a writer thread stores it, so the
+    capture and diff threads never wait on PNG encoding or disk writes.
+    When the writer falls maxsize events behind, new events are dropped.
+    """
+
+    def __init__(self, root=HISTORY_DIR, tile_size=TILE_SIZE, maxsize=HISTORY_QUEUE_SIZE):
+        self.root = root
+        self.tile_size = tile_size
+        self._histories = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self.dropped = 0
+
+    def history(self, name):
+        with self._lock:
+            history = self._histories.get(name)
+            if history is None:
+                history = ChangeHistory(history_dir(self.root, name), self.tile_size)
+                self._histories[name] = history
+            return history
+
+    def record_event(self, event):
+        """Queue the frame of a change event for storing under its target.
+
+        The frame is stored later, so it must not be a buffer that is
+        reused for the next grab.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_events, name="history-writer", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            print(f"Change history is falling behind, dropped a change of {event.get('target') or 'monitor'}")
+
+    def _write_events(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                return
+            try:
+                self.history(event.get("target") or "monitor").record(
+                    event["frame"], event.get("time"), event.get("boxes"), event.get("percent"))
+            except Exception as e:
+                print(f"Error recording change history: {e}")
+
+    def close(self):
+        """Store the events still queued, then close every history."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        with self._lock:
+            for history in self._histories.values():
+                history.close()
+            self._histories = {}
+
+def parse_time(text):
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text)
+
+def main(argv=None):
+    """List a target's history or rebuild one of its frames. Returns the exit code."""
+    parser = argparse.ArgumentParser(description="Inspect a recorded change history.")
+    parser.add_argument("root", help="history directory")
+    parser.add_argument("target", help="target name")
+    parser.add_argument("--at", help="rebuild the frame shown at this ISO time or Unix timestamp")
+    parser.add_argument("--output", default="frame.png", help="where --at saves the frame")
+    args = parser.parse_args(argv)
+
+    path = history_dir(args.root, args.target)
+    if not os.path.isdir(path):
+        print(f"No history for {args.target} in {args.root}")
+        return 1
+    history = ChangeHistory(path)
+
+    if args.at:
+        try:
+            when = parse_time(args.at)
+        except ValueError:
+            print(f"Invalid time: {args.at}")
+            return 2
+        frame = history.frame_at(when)
+        if frame is None:
+            print(f"Nothing was recorded before {args.at}")
+            return 1
+        Image.fromarray(frame if frame.shape[2] != 1 else frame[:, :, 0]).save(args.output)
+        print(f"Frame saved to {args.output}")
+        return 0
+
+    for record in history.records:
+        kind = "key" if record["key"] == record["seq"] else f"{len(record['tiles'])} tiles"
+        percent = f"{record['percent']:.2f}%" if record.get("percent") is not None else ""
+        print(f"{record['seq']:6d}  {datetime.fromtimestamp(record['time']).isoformat(timespec='seconds')}  "
+              f"{kind:>10}  {percent}")
+    stats = history.stats()
+    print(f"{stats['records']} records, {stats['keyframes']} keyframes, {stats['stored_bytes']} bytes "
+          f"({stats['ratio']:.1%} of full frames)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
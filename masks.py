@@ -0,0 +1,137 @@
+import time
+import numpy as np
+from diff_engine import MIN_TILE_SIZE, CHANGE_THRESHOLD, image_to_array, tile_edges
+
+# Frames compared while learning which cells are noisy
+LEARN_FRAMES = 10
+# A cell that changed in at least this share of the learning frames is ignored
+NOISE_FRACTION = 0.5
+
+def window_to_frame(rects, area=None):
+    """Translate window-relative rectangles into the coordinates of a captured area."""
+    if not area:
+        return [tuple(rect) for rect in rects]
+    left, top = area[0], area[1]
+    return [(x1 - left, y1 - top, x2 - left, y2 - top) for x1, y1, x2, y2 in rects]
+
+def frame_to_window(rects, area=None):
+    """Translate rectangles in captured-area coordinates back to window coordinates."""
+    if not area:
+        return [tuple(rect) for rect in rects]
+    left, top = area[0], area[1]
+    return [(x1 + left, y1 + top, x2 + left, y2 + top) for x1, y1, x2, y2 in rects]
+
+class IgnoreMask:
+    """Rectangles of a frame that the diff engine must never compare.
+
+    The rectangles (left, top, right, bottom in frame coordinates) are
+    rasterised once per frame size and tile size by layout() and cached, so
+    each diff only looks the masks up. Tiles that are completely covered are
+    dropped before any pixel is compared; in partly covered tiles the masked
+    pixels are excluded from the comparison.
+    """
+
+    def __init__(self, rects=()):
+        self.rects = [tuple(int(value) for value in rect) for rect in rects]
+        self._layouts = {}
+
+    def __bool__(self):
+        return bool(self.rects)
+
+    def add(self, rects):
+        """Add more ignored rectangles and drop the cached layouts."""
+        self.rects.extend(tuple(int(value) for value in rect) for rect in rects)
+        self._layouts = {}
+
+    def layout(self, height, width, tile_size):
+        """Return (pixels, active, partial, ignored) for a frame size.
+
+        pixels is an (height, width) boolean array that is True for ignored
+        pixels; active and partial are (rows, cols) arrays of the tiles that
+        have any unmasked pixel and of those that are only partly masked;
+        ignored is the number of masked pixels.
+        """
+        key = (height, width, tile_size)
+        if key not in self._layouts:
+            pixels = np.zeros((height, width), dtype=bool)
+            for left, top, right, bottom in self.rects:
+                pixels[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)] = True
+            rows = tile_edges(height, tile_size)
+            cols = tile_edges(width, tile_size)
+            if pixels.size:
+                masked = np.add.reduceat(np.add.reduceat(pixels, rows, axis=0, dtype=np.uint32), cols, axis=1)
+            else:
+                masked = np.zeros((len(rows), len(cols)), dtype=np.uint32)
+            areas = np.outer(np.diff(np.append(rows, height)), np.diff(np.append(cols, width)))
+            # Only the latest frame size is kept; it changes only when a window is resized
+            self._layouts = {key: (pixels, masked < areas, (masked > 0) & (masked < areas),
+                                   int(np.count_nonzero(pixels)))}
+        return self._layouts[key]
+
+class NoiseLearner:
+    """Learn which cells of a target change on their own (clocks, spinners, ads).
+
+    update() is called with consecutive frames while the page is expected to
+    be idle. Every cell of cell_size pixels that changed in at least
+    fraction of the compared frame pairs is reported by rects() so it can
+    be added to an IgnoreMask.
+    """
+
+    def __init__(self, frames=LEARN_FRAMES, cell_size=MIN_TILE_SIZE,
+                 threshold=CHANGE_THRESHOLD, fraction=NOISE_FRACTION):
+        self.frames = frames
+        self.cell_size = cell_size
+        self.threshold = threshold
+        self.fraction = fraction
+        self.compared = 0
+        self._previous = None
+        self._counts = None
+
+    @property
+    def done(self):
+        return self.compared >= self.frames
+
+    def update(self, frame):
+        """Compare a frame with the previous one; returns True once learning is finished."""
+        array = image_to_array(frame)
+        previous = self._previous
+        self._previous = array
+        if previous is None or previous.shape != array.shape:
+            self._counts = None
+            self.compared = 0
+            return False
+
+        diff = np.maximum(previous, array)
+        diff -= np.minimum(previous, array)
+        channel_sum = diff[:, :, 0].astype(np.uint16)
+        for channel in range(1, diff.shape[2]):
+            channel_sum += diff[:, :, channel]
+        changed = channel_sum > self.threshold * array.shape[2]
+        height, width = changed.shape
+        cells = np.add.reduceat(np.add.reduceat(changed, tile_edges(height, self.cell_size), axis=0,
+                                                dtype=np.uint32),
+                                tile_edges(width, self.cell_size), axis=1) > 0
+        self._counts = cells.astype(np.uint32) if self._counts is None else self._counts + cells
+        self.compared += 1
+        return self.done
+
+    def rects(self):
+        """Return the noisy cells found so far as frame rectangles."""
+        if self._counts is None:
+            return []
+        height, width = self._previous.shape[:2]
+        noisy = self._counts >= max(1, self.fraction * self.compared)
+        size = self.cell_size
+        return [(col * size, row * size, min((col + 1) * size, width), min((row + 1) * size, height))
+                for row, col in zip(*(axis.tolist() for axis in np.nonzero(noisy)))]
+
+def learn_noise_rects(grab, frames=LEARN_FRAMES, interval=0.5, cell_size=MIN_TILE_SIZE,
+                      threshold=CHANGE_THRESHOLD):
+    """Grab frames with grab() every interval seconds and return the noisy rectangles."""
+    learner = NoiseLearner(frames, cell_size, threshold)
+    while not learner.done:
+        frame = grab()
+        if frame is not None:
+            learner.update(frame)
+        time.sleep(interval)
+    return learner.rects()
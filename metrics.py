@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prefix of every exported metric name
+METRICS_PREFIX = "browsermonitor_"
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Default port of the local metrics endpoint
+METRICS_PORT = 9108
+# Default seconds between JSON metric dumps
+METRICS_DUMP_INTERVAL = 60.0
+
+class _Timer:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+class Metrics:
+    """Counters, gauges and latency histograms shared by every pipeline stage.
+
+    Recording is one dict update under a lock (plus a bisect for
+    histograms), so instrumentation can stay on in production. Series are
+    keyed by name and labels, e.g. observe("stage_seconds", 0.004,
+    target="news", stage="diff"). Gauges that belong to another object
+    (queue depths) are registered as callbacks and only read when the
+    metrics are exported.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._callbacks = {}
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge to value."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * (len(self.buckets) + 1),
+                                                     "count": 0, "sum": 0.0, "max": 0.0}
+            histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            if seconds > histogram["max"]:
+                histogram["max"] = seconds
+
+    def timer(self, name, **labels):
+        """Context manager that observes how long its block took."""
+        return _Timer(self, name, labels)
+
+    def gauge_callback(self, name, callback):
+        """Read gauge name from callback() on export; it returns a number or {labels tuple: number}."""
+        with self._lock:
+            self._callbacks[name] = callback
+
+    def reset(self):
+        """Drop every recorded series (callbacks stay registered)."""
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}
+
+    def _collect(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: dict(value, buckets=list(value["buckets"]))
+                          for key, value in self._histograms.items()}
+            callbacks = dict(self._callbacks)
+        for name, callback in callbacks.items():
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Error reading metric {name}: {e}")
+                continue
+            if isinstance(value, dict):
+                for labels, item in value.items():
+                    gauges[(name, tuple(sorted(labels)))] = item
+            else:
+                gauges[(name, ())] = value
+        return counters, gauges, histograms
+
+    def snapshot(self):
+        """Return every series as JSON-friendly dicts."""
+        counters, gauges, histograms = self._collect()
+        return {
+            "time": time.time(),
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters.items())],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in sorted(gauges.items())],
+            "histograms": [{"name": name, "labels": dict(labels), "count": value["count"],
+                            "sum": value["sum"], "max": value["max"],
+                            "mean": value["sum"] / value["count"] if value["count"] else 0.0,
+                            "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"],
+                                                value["buckets"]))}
+                           for (name, labels), value in sorted(histograms.items())]
+        }
+
+    def prometheus(self):
+        """Render every series in the Prometheus text exposition format."""
+        counters, gauges, histograms = self._collect()
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name == name:
+                        lines.append(f"{METRICS_PREFIX}{name}{_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} histogram")
+            for (series_name, labels), value in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([str(bound) for bound in self.buckets] + ["+Inf"], value["buckets"]):
+                    cumulative += count
+                    lines.append(f"{METRICS_PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{METRICS_PREFIX}{name}_sum{_labels(labels)} {value['sum']}")
+                lines.append(f"{METRICS_PREFIX}{name}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class MetricsServer:
+    """Serve the metrics over HTTP: /metrics (Prometheus text) and /metrics.json.
+
+    Binds to localhost by default; the server runs on its own daemon thread.
+    """
+
+    def __init__(self, registry=None, port=METRICS_PORT, host="127.0.0.1"):
+        self.registry = registry or metrics
+        self.port = port
+        self.host = host
+        self._server = None
+
+    def start(self):
+        if self._server is not None:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body = registry.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class MetricsDumper:
+    """Write the metrics snapshot to a JSON file every interval seconds (and once on stop)."""
+
+    def __init__(self, path, registry=None, interval=METRICS_DUMP_INTERVAL):
+        self.path = path
+        self.registry = registry or metrics
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.dump()
+
+    def dump(self):
+        # Written to a temporary file first so readers never see half a dump
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+# Shared registry every stage records into
+metrics = Metrics()
@@ -0,0 +1,227 @@
+"""Headless Browser Monitor daemon.
+
+Runs the capture/diff/notify pipeline for the targets listed in a JSON
+config file without importing Tk, pygame or any dialog module:
+
+    python BrowserMonitor.py --daemon targets.json
+    python monitor_daemon.py targets.json
+
+Example config:
+
+    {
+        "workers": 4,
+        "processes": 16,
+        "telegram": {"bot_token": "...", "chat_id": "..."},
+        "targets": [
+            {"name": "prices", "window_title": "Chrome", "area": [0, 200, 400, 300],
+             "interval": 1.0, "max_interval": 10.0, "threshold": 10, "min_change_percent": 2,
+             "ignore": [[300, 200, 400, 230]]},
+            {"name": "left screen", "region": [0, 0, 1920, 1080], "interval": 5, "learn_frames": 10}
+        ]
+    }
+
+"processes" moves the pixel comparison into that many worker processes
+(frames are passed through shared memory) so many targets and large
+windows scale across cores; by default comparisons run in "workers"
+threads.
+
+"cooldown" is the least number of seconds between two alerts of the same
+target (default 60). "window_title" targets need pygetwindow, which only
+supports Windows and macOS; elsewhere they are skipped, so use "region".
+
+Idle targets back off from "interval" up to "max_interval" seconds and
+snap back as soon as they change. A target only alerts once at least
+"min_change_percent" of its pixels changed (default 0: any changed pixel).
+Changes are boxed in cells of "min_tile_size" pixels (default 20; use 100
+for whole tiles).
+"perceptual": true also skips tiles whose perceptual hash is unchanged
+(faster, but lossy). "ignore" lists [left, top, right, bottom] rectangles
+(window or region coordinates) that are never compared, and
+"learn_frames" first watches that many frames and ignores the cells that
+kept changing (clocks, spinners, ads). "adaptive": true learns each
+tile's normal flicker and only lets a tile fire once it leaves that band.
+"mode" picks how frames are compared: "rgb" (default), "luma" (grayscale)
+or "luma2x"/"luma4x" (grayscale averaged over 2x2/4x4 blocks: cheaper, but
+changes smaller than a block are softened).
+The "telegram" section is optional and falls back to telegram_config.json.
+With Telegram configured, the chat can control the targets: /targets,
+/pause and /resume <target>, /snapshot <target>, /interval and
+/threshold <target> <value>, /stats [target] and /help (see
+remote_control.py). "telegram_commands": false turns this off.
+
+"history_dir" keeps an on-disk history of every change per target (a
+keyframe plus the changed tiles; inspect it with history.py).
+
+"clip_frames": N keeps the last frames of a target in a memory-mapped
+ring and saves N frames before through N after every change as a clip
+under clips/<target>/ ("clip_format": "gif" or "png" for APNG).
+
+"metrics_port" serves per-stage timings, counters and queue depths on
+http://127.0.0.1:<port>/metrics (Prometheus text) and /metrics.json;
+"metrics_file" writes the same JSON every "metrics_interval" seconds
+(default 60).
+"""
+import sys
+import json
+import signal
+import threading
+from capture import ScreenArea
+from clips import CLIP_GIF, CLIP_FORMATS
+from config_store import DEFAULT_ALERT_SETTINGS, store
+from diff_engine import CHANGE_THRESHOLD, MIN_TILE_SIZE, COMPARE_RGB, COMPARE_MODES, describe_regions
+from history import HistoryRecorder
+from metrics import METRICS_DUMP_INTERVAL, MetricsServer, MetricsDumper
+from notifications import NotificationDispatcher, event_overlay
+from polling import MAX_POLL_INTERVAL
+from remote_control import RemoteControl
+from scheduler import WatchTarget, MonitorScheduler
+from telegram_client import TELEGRAM_TIMEOUT, TelegramCommandListener, load_telegram_config, send_change_notification
+
+def find_window(title):
+    """Return the first window whose title contains the given text, or None."""
+    # Imported lazily so region-only configs never touch the windowing API
+    import pygetwindow as gw
+    windows = [win for win in gw.getWindowsWithTitle(title) if win.title]
+    return windows[0] if windows else None
+
+def load_targets(config):
+    """Build WatchTargets from the "targets" section of a daemon config."""
+    targets = []
+    for index, spec in enumerate(config.get('targets', [])):
+        name = spec.get('name', f"target-{index + 1}")
+        if 'region' in spec:
+            window = ScreenArea(*spec['region'], title=name)
+        elif 'window_title' in spec:
+            try:
+                window = find_window(spec['window_title'])
+            except (ImportError, NotImplementedError) as e:
+                # pygetwindow only supports Windows and macOS; use a "region" target elsewhere
+                print(f"Window targets are not supported on this platform ({e}), skipping {name}")
+                continue
+            if window is None:
+                print(f"No window matching '{spec['window_title']}' for target {name}, skipping")
+                continue
+        else:
+            print(f"Target {name} needs a 'region' or 'window_title', skipping")
+            continue
+
+        mode = spec.get('mode', COMPARE_RGB)
+        if mode not in COMPARE_MODES:
+            print(f"Unknown mode '{mode}' for target {name}, skipping")
+            continue
+        clip_format = spec.get('clip_format', CLIP_GIF)
+        if clip_format not in CLIP_FORMATS:
+            print(f"Unknown clip format '{clip_format}' for target {name}, skipping")
+            continue
+
+        area = tuple(spec['area']) if spec.get('area') else None
+        targets.append(WatchTarget(name, window, area,
+                                   interval=float(spec.get('interval', 1.0)),
+                                   max_interval=float(spec.get('max_interval', MAX_POLL_INTERVAL)),
+                                   threshold=float(spec.get('threshold', CHANGE_THRESHOLD)),
+                                   min_change_percent=float(spec.get('min_change_percent', 0)),
+                                   perceptual=bool(spec.get('perceptual', False)),
+                                   min_tile_size=int(spec.get('min_tile_size', MIN_TILE_SIZE)),
+                                   ignore=spec.get('ignore'),
+                                   learn_frames=int(spec.get('learn_frames', 0)),
+                                   adaptive=bool(spec.get('adaptive', False)),
+                                   compare_mode=mode,
+                                   clip_frames=int(spec.get('clip_frames', 0)),
+                                   clip_format=clip_format))
+    return targets
+
+def main(argv=None):
+    """Run the daemon until SIGINT/SIGTERM. Returns the process exit code."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: monitor_daemon.py <config.json>")
+        return 2
+
+    try:
+        with open(argv[0], 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read config {argv[0]}: {e}")
+        return 1
+
+    def get_telegram_config():
+        # telegram_config.json is re-read from the store so edits apply without a restart
+        return config.get('telegram') or load_telegram_config()
+
+    if not get_telegram_config():
+        print("Telegram is not configured; changes will only be logged")
+
+    def send_telegram(event, timeout):
+        telegram_config = get_telegram_config()
+        if telegram_config:
+            send_change_notification(telegram_config, event_overlay(event), event["target"], timeout=timeout,
+                                     regions=event.get("regions"))
+
+    notifier = NotificationDispatcher(maxsize=config.get('notification_queue', 20))
+    notifier.add_channel("Telegram", send_telegram, timeout=TELEGRAM_TIMEOUT)
+
+    history = HistoryRecorder(config['history_dir']) if config.get('history_dir') else None
+
+    cooldown = float(config.get('cooldown', DEFAULT_ALERT_SETTINGS['cooldown_period']))
+
+    def on_change(target, event):
+        print(f"Change detected in {target.name} at {event['time'].strftime('%I:%M:%S %p')} "
+              f"({describe_regions(event['regions'])})")
+        if history is not None:
+            history.record_event(event)
+        if target.cooldown.ready(cooldown):
+            notifier.submit(event)
+
+    targets = load_targets(config)
+    if not targets:
+        print("No usable targets in config")
+        return 1
+
+    scheduler = MonitorScheduler(on_change=on_change, workers=config.get('workers'),
+                                 processes=config.get('processes', 0))
+    for target in targets:
+        scheduler.add_target(target)
+
+    exporters = []
+    if config.get('metrics_port'):
+        exporters.append(MetricsServer(port=int(config['metrics_port'])))
+    if config.get('metrics_file'):
+        exporters.append(MetricsDumper(config['metrics_file'],
+                                       interval=float(config.get('metrics_interval', METRICS_DUMP_INTERVAL))))
+    for exporter in exporters:
+        try:
+            exporter.start()
+        except OSError as e:
+            print(f"Could not start metrics export: {e}")
+
+    listener = None
+    if config.get('telegram_commands', True) and get_telegram_config():
+        remote_control = RemoteControl(lambda: scheduler, get_config=get_telegram_config)
+        listener = TelegramCommandListener(remote_control.handle, get_config=get_telegram_config)
+
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *args: stopped.set())
+
+    print(f"Monitoring {len(targets)} target(s)")
+    store.start()
+    notifier.start()
+    scheduler.start()
+    if listener is not None:
+        listener.start()
+    while scheduler.running and not stopped.wait(1):
+        pass
+    if listener is not None:
+        listener.stop()
+    scheduler.close()
+    notifier.stop()
+    for exporter in exporters:
+        exporter.stop()
+    if history is not None:
+        history.close()
+    store.stop()
+    print("Monitoring stopped")
+    return 0 if stopped.is_set() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
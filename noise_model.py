@@ -0,0 +1,97 @@
+import numpy as np
+from diff_engine import TILE_SIZE, tile_difference_means
+
+# Frames used to learn each tile's noise before it is allowed to gate changes
+WARMUP_FRAMES = 20
+# Weight of the newest score in the running mean and variance
+NOISE_ALPHA = 0.05
+# How many standard deviations above its mean a tile's score must go to fire
+NOISE_SIGMAS = 3.0
+# Smallest band (in mean pixel difference) so a perfectly static tile still tolerates rounding
+NOISE_FLOOR = 0.5
+
+class TileNoiseModel:
+    """Per-tile running mean and variance of the difference score.
+
+    check() takes the mean difference of every tile (the same score
+    calculate_image_difference() reports) between two consecutive frames,
+    and returns a (rows, cols) mask of the tiles whose score went past
+    their own learned band, mean + sigmas * std. The estimate is an
+    exponentially weighted one; during the first warmup frames it averages
+    faster and check() returns None so callers fall back to the global
+    threshold. Once warmed up, a tile that fires is learned at its band
+    rather than its score: a one-off change barely widens the band, while
+    a tile that turned noisy keeps widening it until the noise fits.
+    Frames the prefilter skipped as identical are learned through skip()
+    as all-zero scores. The mask only narrows which tiles the diff engine compares,
+    so it never makes detection more sensitive than the global threshold.
+    """
+
+    def __init__(self, tile_size=TILE_SIZE, warmup=WARMUP_FRAMES, alpha=NOISE_ALPHA,
+                 sigmas=NOISE_SIGMAS, floor=NOISE_FLOOR):
+        self.tile_size = tile_size
+        self.warmup = warmup
+        self.alpha = alpha
+        self.sigmas = sigmas
+        self.floor = floor
+        self.reset()
+
+    def reset(self):
+        """Forget everything learned (e.g. after the window was resized)."""
+        self.frames = 0
+        self.mean = None
+        self.var = None
+
+    @property
+    def warming_up(self):
+        return self.frames < self.warmup
+
+    def band(self):
+        """Return the (rows, cols) score each tile has to exceed to fire."""
+        return self.mean + np.maximum(self.sigmas * np.sqrt(self.var), self.floor)
+
+    def check(self, img1, img2):
+        """Score the tiles of a frame pair, returning the firing mask (None while warming up)."""
+        return self.observe(tile_difference_means(img1, img2, self.tile_size))
+
+    def observe(self, scores):
+        """Gate already computed tile scores against the band, then learn from them."""
+        scores = np.asarray(scores, dtype=np.float32)
+        if self.mean is None or self.mean.shape != scores.shape:
+            self.reset()
+            self.mean = np.zeros_like(scores)
+            self.var = np.zeros_like(scores)
+
+        if self.warming_up:
+            self.update(scores)
+            return None
+        band = self.band()
+        firing = scores > band
+        self.update(np.minimum(scores, band))
+        return firing
+
+    def skip(self):
+        """Learn a frame the prefilter found identical to the previous one."""
+        if self.mean is not None:
+            self.update(np.zeros_like(self.mean))
+
+    def update(self, scores):
+        """Fold one frame's tile scores into the running estimate."""
+        self.frames += 1
+        # Plain averaging while warming up, then a fixed exponential weight
+        alpha = max(self.alpha, 1.0 / self.frames)
+        delta = scores - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+    def stats(self):
+        """Summarise the learned noise for display."""
+        if self.mean is None:
+            return {"frames": 0, "warming_up": True, "noisy_tiles": 0, "mean_band": 0.0}
+        band = self.band()
+        return {
+            "frames": self.frames,
+            "warming_up": self.warming_up,
+            "noisy_tiles": int(np.count_nonzero(band > 1.0)),
+            "mean_band": float(band.mean()) if band.size else 0.0
+        }
@@ -0,0 +1,157 @@
+import time
+import threading
+from collections import deque
+from diff_engine import render_overlay
+from metrics import metrics
+
+# Queue-full policies
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+def event_overlay(event):
+    """Return the event's overlay image, rendering (and caching) it on first use."""
+    if event.get("overlay") is None and event.get("frame") is not None:
+        with metrics.timer("stage_seconds", target=event.get("target"), stage="overlay"):
+            event["overlay"] = render_overlay(event["frame"], event.get("boxes", []))
+    return event.get("overlay")
+
+class AlertCooldown:
+    """Rate-limit alerts to at most one per cooldown period."""
+
+    def __init__(self, period=0):
+        self.period = period
+        self.last_alert = None
+        self.suppressed = 0
+
+    def ready(self, period=None, now=None):
+        """Return True (and start a new cooldown) if an alert may fire now."""
+        period = self.period if period is None else period
+        now = time.monotonic() if now is None else now
+        if self.last_alert is not None and now - self.last_alert < period:
+            self.suppressed += 1
+            return False
+        self.last_alert = now
+        return True
+
+class NotificationDispatcher:
+    """Deliver change events to notification channels off the detection thread.
+
+    submit() only appends the event to a bounded queue and returns at once.
+    Worker threads hand each event to every registered channel; a channel is
+    a callable handler(event, timeout) that raises on failure and is retried
+    with exponential backoff. When the queue is full the policy decides
+    whether the new event is dropped (DROP_NEWEST), the oldest pending event
+    is dropped (DROP_OLDEST), or a pending event for the same target is
+    replaced by the newer one (COALESCE, falling back to DROP_OLDEST).
+    Delivery time per channel (retries included), outcomes and the queue
+    depth are exported through the metrics.
+    """
+
+    def __init__(self, maxsize=20, workers=1, policy=COALESCE, on_failure=None):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_failure = on_failure
+        self.channels = []
+        self.running = False
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._workers = workers
+        self._threads = []
+
+        # Statistics
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def add_channel(self, name, handler, timeout=10, retries=2, backoff=1.0):
+        """Register a channel called as handler(event, timeout)."""
+        self.channels.append({
+            "name": name,
+            "handler": handler,
+            "timeout": timeout,
+            "retries": retries,
+            "backoff": backoff
+        })
+
+    def start(self):
+        """Start the worker threads if they are not already running."""
+        if self.running:
+            return
+        self.running = True
+        metrics.gauge_callback("notification_queue_depth", self.queue_depth)
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(self._workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the workers once they finish their current event."""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, event):
+        """Queue an event for delivery. Returns False if it was dropped."""
+        with self._cond:
+            self.submitted += 1
+            if len(self._pending) >= self.maxsize:
+                if self.policy == COALESCE:
+                    for index, pending in enumerate(self._pending):
+                        if pending.get("target") == event.get("target"):
+                            self._pending[index] = event
+                            self.coalesced += 1
+                            metrics.inc("notifications_coalesced_total")
+                            self._cond.notify()
+                            return True
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    metrics.inc("notifications_dropped_total")
+                    return False
+                self._pending.popleft()
+                self.dropped += 1
+                metrics.inc("notifications_dropped_total")
+            self._pending.append(event)
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.running and not self._pending:
+                    self._cond.wait()
+                if not self.running:
+                    return
+                event = self._pending.popleft()
+
+            for channel in self.channels:
+                self._deliver(channel, event)
+
+    def _deliver(self, channel, event):
+        delay = channel["backoff"]
+        started = time.perf_counter()
+        for attempt in range(channel["retries"] + 1):
+            try:
+                channel["handler"](event, channel["timeout"])
+                self.delivered += 1
+                metrics.observe("notify_seconds", time.perf_counter() - started, channel=channel["name"])
+                metrics.inc("notifications_total", channel=channel["name"], result="delivered")
+                return
+            except Exception as e:
+                error = e
+                if attempt == channel["retries"] or not self.running:
+                    break
+                time.sleep(delay)
+                delay *= 2
+
+        self.failed += 1
+        metrics.observe("notify_seconds", time.perf_counter() - started, channel=channel["name"])
+        metrics.inc("notifications_total", channel=channel["name"], result="failed")
+        print(f"Error sending {channel['name']} notification: {error}")
+        if self.on_failure:
+            self.on_failure(channel["name"], event, error)
@@ -0,0 +1,79 @@
+import time
+
+# Default ceiling (seconds) an idle target backs off to
+MAX_POLL_INTERVAL = 10.0
+# Unchanged ticks before the interval starts backing off
+IDLE_TICKS_BEFORE_BACKOFF = 5
+BACKOFF_FACTOR = 1.5
+
+class AdaptivePoller:
+    """Deadline-based polling interval that adapts to how often a region changes.
+
+    tick() is called when a capture starts and returns the next deadline,
+    measured from the previous deadline rather than from "now" so capture and
+    diff time do not make the interval drift. record() is called with the
+    diff result: a change snaps the interval back to the base interval,
+    while a run of unchanged ticks backs it off towards max_interval.
+    """
+
+    def __init__(self, interval=1.0, max_interval=MAX_POLL_INTERVAL,
+                 backoff=BACKOFF_FACTOR, idle_ticks=IDLE_TICKS_BEFORE_BACKOFF):
+        self.base_interval = interval
+        self.max_interval = max(interval, max_interval or interval)
+        self.backoff = backoff
+        self.idle_ticks = idle_ticks
+
+        self.interval = interval
+        self.deadline = None
+        self.quiet_ticks = 0
+        self._last_tick = None
+        self._period = None
+
+    def tick(self, now=None):
+        """Register a tick starting now and return the deadline of the next one."""
+        now = time.monotonic() if now is None else now
+        if self._last_tick is not None:
+            period = now - self._last_tick
+            self._period = period if self._period is None else 0.8 * self._period + 0.2 * period
+        self._last_tick = now
+
+        if self.deadline is None:
+            self.deadline = now
+        self.deadline += self.interval
+        if self.deadline < now:
+            # Fell behind by more than a whole interval; resync instead of bursting
+            self.deadline = now + self.interval
+        return self.deadline
+
+    def record(self, changed):
+        """Adapt the interval to the outcome of the last tick."""
+        if changed:
+            self.poke(immediate=False)
+            return
+        self.quiet_ticks += 1
+        if self.quiet_ticks >= self.idle_ticks and self.interval < self.max_interval:
+            self._set_interval(min(self.interval * self.backoff, self.max_interval))
+
+    def poke(self, immediate=True):
+        """Tighten back to the base interval, optionally making the next tick due now."""
+        self.quiet_ticks = 0
+        self._set_interval(self.base_interval)
+        if immediate and self.deadline is not None:
+            self.deadline = time.monotonic()
+
+    def set_base_interval(self, interval):
+        """Change the base interval (raising the ceiling if needed) and restart from it."""
+        self.base_interval = interval
+        self.max_interval = max(self.max_interval, interval)
+        self.poke(immediate=False)
+
+    def _set_interval(self, interval):
+        # Move the pending deadline along with the interval it was computed from
+        if self.deadline is not None:
+            self.deadline += interval - self.interval
+        self.interval = interval
+
+    @property
+    def fps(self):
+        """Effective ticks per second, smoothed over recent ticks."""
+        return 1.0 / self._period if self._period else 0.0
@@ -0,0 +1,224 @@
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from diff_engine import TILE_SIZE, MIN_TILE_SIZE, CHANGE_THRESHOLD, image_to_array, tile_difference_means, \
+    changed_pixel_ratio, detect_changes
+from masks import IgnoreMask
+
+# Workers are forked where possible (fast to start, nothing re-imported). Elsewhere
+# (Windows) they are spawned, which imports the main script: it must keep its work
+# under an if __name__ == "__main__" guard
+FORK_AVAILABLE = "fork" in multiprocessing.get_all_start_methods()
+# A frame is only split into stripes once each stripe gets at least this many pixels
+STRIPE_MIN_PIXELS = 500000
+# Shared memory blocks a worker keeps mapped before closing the oldest ones
+WORKER_MAPPED_BLOCKS = 64
+
+# Numbers handed out by new_generation(), unique for the life of the process
+_generations = itertools.count(1)
+
+def new_generation():
+    """Return a new number identifying one captured frame's pixels for detect()."""
+    return next(_generations)
+
+class SharedFrame:
+    """A shared memory block holding one frame, reused while the frame size allows."""
+
+    def __init__(self):
+        self.shm = None
+        self.shape = None
+
+    def write(self, frame):
+        """Copy a frame into the block and return the (name, shape) workers map it by."""
+        array = image_to_array(frame)
+        if self.shm is None or self.shm.size < array.nbytes:
+            self.close()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.shape = array.shape
+        np.ndarray(array.shape, dtype=np.uint8, buffer=self.shm.buf)[:] = array
+        return (self.shm.name, self.shape)
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+# Worker side: blocks stay mapped between tasks, masks are rasterised once
+_mapped = {}
+_masks = {}
+_forked = False
+
+def _init_worker(forked):
+    global _forked
+    _forked = forked
+
+def _attach(spec):
+    name, shape = spec
+    shm = _mapped.get(name)
+    if shm is None:
+        if len(_mapped) >= WORKER_MAPPED_BLOCKS:
+            _mapped.pop(next(iter(_mapped))).close()
+        shm = shared_memory.SharedMemory(name=name)
+        if _forked:
+            # The parent owns (and unlinks) the block; don't let the resource tracker this
+            # worker started clean it up. Spawned workers share the parent's tracker instead
+            resource_tracker.unregister(shm._name, "shared_memory")
+        _mapped[name] = shm
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+def _stripe_mask(rects, top):
+    key = (tuple(rects), top)
+    mask = _masks.get(key)
+    if mask is None:
+        if len(_masks) >= WORKER_MAPPED_BLOCKS:
+            _masks.pop(next(iter(_masks)))
+        mask = IgnoreMask([(left, y1 - top, right, y2 - top) for left, y1, right, y2 in rects])
+        _masks[key] = mask
+    return mask
+
+def _diff_stripe(baseline_spec, frame_spec, top, bottom, tile_size, min_tile_size, threshold,
+                 candidates, ignore_rects, band, want_scores):
+    """Compare rows [top, bottom) of two shared frames; runs in a worker process.
+
+    The stripe goes through detect_changes() with no minimum, so it takes
+    the same route (whole tiles or coarse-to-fine) as an in-thread
+    comparison. The changed pixel count is exact unless the coarse-to-fine
+    route found nothing in the stripe and stopped early; exact says which.
+    """
+    a = _attach(baseline_spec)[top:bottom]
+    b = _attach(frame_spec)[top:bottom]
+
+    scores = None
+    if want_scores:
+        scores = tile_difference_means(a, b, tile_size)
+        if band is not None and band.shape == scores.shape:
+            firing = scores > band
+            candidates = firing if candidates is None else candidates & firing
+
+    ignore = _stripe_mask(ignore_rects, top) if ignore_rects else None
+    boxes, percent = detect_changes(a, b, tile_size, threshold, 0, candidates, min_tile_size, ignore)
+    total = _stripe_total(a, b, tile_size, ignore)
+    exact = bool(boxes) or not (ignore or min_tile_size < tile_size)
+    changed = int(round(percent * total / 100))
+    return [(x1, y1 + top, x2, y2 + top) for x1, y1, x2, y2 in boxes], changed, total, scores, exact
+
+def _count_stripe(baseline_spec, frame_spec, top, bottom, tile_size, threshold, ignore_rects):
+    """Count every changed pixel in rows [top, bottom) of two shared frames; runs in a worker process."""
+    a = _attach(baseline_spec)[top:bottom]
+    b = _attach(frame_spec)[top:bottom]
+    ignore = _stripe_mask(ignore_rects, top) if ignore_rects else None
+    ignored = ignore.layout(min(a.shape[0], b.shape[0]), min(a.shape[1], b.shape[1]), tile_size)[0] if ignore else None
+    _, percent = changed_pixel_ratio(a, b, None, threshold, ignored)
+    return int(round(percent * _stripe_total(a, b, tile_size, ignore) / 100))
+
+def _stripe_total(a, b, tile_size, ignore):
+    height = min(a.shape[0], b.shape[0])
+    width = min(a.shape[1], b.shape[1])
+    return height * width - (ignore.layout(height, width, tile_size)[3] if ignore else 0)
+
+def _ready():
+    return True
+
+class ProcessDiffPool:
+    """Run frame comparisons in worker processes, free of the GIL.
+
+    Frames are copied once into shared memory blocks (two per key, so the
+    last frame doubles as the next baseline without a second copy) and
+    workers map them instead of receiving pickled images. Large frames are
+    cut into horizontal stripes of whole tiles that are compared in
+    parallel; separate keys (targets) run in parallel anyway. Each stripe
+    is compared exactly as detect_changes() would; when any stripe changed,
+    the changed pixels are counted in full so the stripes add up to the
+    frame's exact share.
+    """
+
+    def __init__(self, workers=None, stripes=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.stripes = stripes or self.workers
+        context = multiprocessing.get_context("fork" if FORK_AVAILABLE else "spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(FORK_AVAILABLE,))
+        # Start the workers now, before the capture and diff threads exist
+        self._executor.submit(_ready).result()
+        self._slots = {}
+
+    def _frame_specs(self, key, baseline, frame, generations):
+        slots = self._slots.setdefault(key, {"frames": [SharedFrame(), SharedFrame()], "generation": None,
+                                             "spec": None})
+        frames = slots["frames"]
+        baseline_generation, generation = generations or (None, None)
+        if baseline_generation is not None and slots["generation"] == baseline_generation:
+            # The baseline is the frame written last time; write the new one to the other block.
+            # Only the number tells: capture buffers are refilled, so the same object may hold new pixels
+            baseline_spec = slots["spec"]
+            frames.reverse()
+        else:
+            baseline_spec = frames[0].write(baseline)
+        frame_spec = frames[1].write(frame)
+        slots["generation"], slots["spec"] = generation, frame_spec
+        return baseline_spec, frame_spec
+
+    def detect(self, key, baseline, frame, tile_size=TILE_SIZE, threshold=CHANGE_THRESHOLD, min_percent=0,
+               candidates=None, min_tile_size=MIN_TILE_SIZE, ignore_rects=None, band=None, want_scores=False,
+               generations=None):
+        """Compare two frames like detect_changes(); returns (boxes, percent, scores).
+
+        With want_scores the per-tile difference means are returned for a
+        TileNoiseModel, and tiles that stay inside the (rows, cols) noise
+        band are not compared; otherwise scores is None. generations is the
+        (baseline, frame) pair of new_generation() numbers given to the two
+        frames when they were captured: a baseline numbered like the frame
+        compared last for the key is not copied again. Without them both
+        frames are always copied.
+        """
+        baseline_spec, frame_spec = self._frame_specs(key, baseline, frame, generations)
+        height = min(baseline_spec[1][0], frame_spec[1][0])
+        width = min(baseline_spec[1][1], frame_spec[1][1])
+        min_tile_size = min(min_tile_size or tile_size, tile_size)
+
+        # Stripes are whole rows of tiles so masks and bands slice cleanly
+        rows = -(-height // tile_size)
+        count = max(1, min(self.stripes, rows, height * width // STRIPE_MIN_PIXELS))
+        bounds = [round(rows * index / count) for index in range(count + 1)]
+        stripes = [(first * tile_size, min(last * tile_size, height), first, last)
+                   for first, last in zip(bounds, bounds[1:]) if first != last]
+        futures = [self._executor.submit(
+            _diff_stripe, baseline_spec, frame_spec, top, bottom, tile_size, min_tile_size, threshold,
+            candidates[first:last] if candidates is not None else None, ignore_rects,
+            band[first:last] if band is not None else None, want_scores)
+            for top, bottom, first, last in stripes]
+        results = [future.result() for future in futures]
+
+        boxes = [box for result in results for box in result[0]]
+        counts = [result[1] for result in results]
+        if boxes:
+            # An alert reports the frame's exact share: count the stripes that stopped early in full
+            recount = {index: self._executor.submit(_count_stripe, baseline_spec, frame_spec, top, bottom,
+                                                    tile_size, threshold, ignore_rects)
+                       for index, (top, bottom, _, _) in enumerate(stripes) if not results[index][4]}
+            for index, future in recount.items():
+                counts[index] = future.result()
+        changed = sum(counts)
+        total = sum(result[2] for result in results)
+
+        percent = changed * 100 / total if total else 0.0
+        # At least one pixel must change, even with a 0% minimum
+        if not boxes or changed < max(1, int(np.ceil(total * min_percent / 100))):
+            boxes = []
+        return boxes, percent, np.concatenate([result[3] for result in results]) if want_scores else None
+
+    def release(self, key):
+        """Free the shared memory blocks kept for a key."""
+        slots = self._slots.pop(key, None)
+        if slots:
+            for shared in slots["frames"]:
+                shared.close()
+
+    def close(self):
+        """Shut the workers down and free every shared memory block."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for key in list(self._slots):
+            self.release(key)
@@ -0,0 +1,256 @@
+"""Telegram commands that control the scheduler's watch targets.
+
+    /targets                     list the targets and their state
+    /pause <target>              stop checking a target
+    /resume <target>             start checking it again
+    /snapshot <target>           capture the target now and send the picture
+    /interval <target> <seconds> change how often a target is checked
+    /threshold <target> <value>  change the per-tile change threshold
+    /stats [target]              ticks/sec, last change and diff latency
+    /help                        list the commands
+
+The target name may be left out while there is only one target, and is
+matched case-insensitively when no target has that exact name.
+"""
+import html
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from PIL import Image
+from capture import CaptureSession
+from fingerprint import frame_hash
+from telegram_client import (TELEGRAM_TIMEOUT, load_telegram_config, encode_png, photo_file_id,
+                             send_telegram_message, send_telegram_photo)
+
+# Distinct snapshots whose PNG (and Telegram file_id) are kept for repeat requests
+SNAPSHOT_CACHE_SIZE = 8
+# Bounds accepted by /interval (seconds)
+MIN_REMOTE_INTERVAL = 0.1
+MAX_REMOTE_INTERVAL = 3600.0
+
+COMMAND_HELP = [
+    "/targets - List watch targets",
+    "/pause &lt;target&gt; - Pause a target",
+    "/resume &lt;target&gt; - Resume a target",
+    "/snapshot &lt;target&gt; - Send a screenshot of a target",
+    "/interval &lt;target&gt; &lt;seconds&gt; - Change a target's interval",
+    "/threshold &lt;target&gt; &lt;value&gt; - Change a target's threshold",
+    "/stats [target] - Per-target statistics",
+    "/help - Show this help message"
+]
+
+def parse_command(text):
+    """Split a message into (command, arguments); the command is lower-cased without any @bot suffix."""
+    words = text.split()
+    if not words or not words[0].startswith("/"):
+        return None, []
+    return words[0].split("@")[0].lower(), words[1:]
+
+class SnapshotCache:
+    """Encoded snapshots keyed by the frame's pixel hash, least recently used first out.
+
+    Each entry holds the PNG bytes and, once Telegram has stored the photo,
+    its file_id, so an unchanged picture is neither encoded nor uploaded
+    again.
+    """
+
+    def __init__(self, size=SNAPSHOT_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame):
+        """Return the [png, file_id] entry for a frame, encoding it on a miss."""
+        key = frame_hash(frame)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = [encode_png(Image.fromarray(frame)).getvalue(), None]
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+class RemoteControl:
+    """Answer Telegram commands about the targets of a MonitorScheduler.
+
+    handle(text) parses one message and sends the reply itself, so it
+    blocks for the capture and the network round trips; call it off any
+    UI thread. get_scheduler() returns the scheduler to act on and
+    get_config() the Telegram configuration to reply with. on_update(target)
+    is called after a target's interval or threshold was changed.
+    extra_help lists commands the caller handles itself, shown by /help.
+    """
+
+    def __init__(self, get_scheduler, get_config=load_telegram_config, on_update=None, extra_help=()):
+        self.get_scheduler = get_scheduler
+        self.get_config = get_config
+        self.on_update = on_update
+        self.extra_help = list(extra_help)
+        self.snapshots = SnapshotCache()
+        self.commands = {
+            "/targets": self.list_targets,
+            "/pause": self.pause,
+            "/resume": self.resume,
+            "/snapshot": self.snapshot,
+            "/interval": self.set_interval,
+            "/threshold": self.set_threshold,
+            "/stats": self.stats,
+            "/help": self.help
+        }
+
+    def handles(self, text):
+        """Return True if text is one of the commands handled here."""
+        return parse_command(text)[0] in self.commands
+
+    def handle(self, text):
+        """Run a command and send its reply."""
+        command, args = parse_command(text)
+        if command not in self.commands:
+            return
+        try:
+            reply = self.commands[command](args)
+        except Exception as e:
+            print(f"Error handling Telegram command {command}: {e}")
+            reply = f"{command} failed: {html.escape(str(e))}"
+        if reply:
+            send_telegram_message(reply, self.get_config())
+
+    def _targets(self):
+        scheduler = self.get_scheduler()
+        return list(scheduler.targets) if scheduler is not None else []
+
+    def _find(self, name):
+        """Return (target, None) for a target name, or (None, error message)."""
+        targets = self._targets()
+        if not targets:
+            return None, "No watch targets."
+        if not name:
+            if len(targets) == 1:
+                return targets[0], None
+            return None, "Which target? Use /targets to list them."
+        for target in targets:
+            if target.name == name:
+                return target, None
+        matches = [target for target in targets if target.name.lower() == name.lower()]
+        if len(matches) == 1:
+            return matches[0], None
+        return None, f"No target named '{html.escape(name)}'. Use /targets to list them."
+
+    def _find_with_value(self, args, what):
+        """Split "<target> <number>" arguments into (target, value, None) or (None, None, error)."""
+        try:
+            value = float(args[-1])
+        except (IndexError, ValueError):
+            return None, None, f"Usage: /{what} &lt;target&gt; &lt;{what}&gt;"
+        target, error = self._find(" ".join(args[:-1]))
+        return target, value, error
+
+    def list_targets(self, args):
+        targets = self._targets()
+        if not targets:
+            return "No watch targets."
+        lines = [f"<b>{len(targets)} target(s):</b>"]
+        for target in targets:
+            stats = target.stats()
+            lines.append(f"• {html.escape(stats['name'])} - {stats['status']}, every {stats['interval']:.1f}s")
+        return "\n".join(lines)
+
+    def pause(self, args):
+        target, error = self._find(" ".join(args))
+        if error:
+            return error
+        if target.paused:
+            return f"{html.escape(target.name)} is already paused."
+        target.paused = True
+        return f"Paused {html.escape(target.name)}."
+
+    def resume(self, args):
+        target, error = self._find(" ".join(args))
+        if error:
+            return error
+        if not target.paused:
+            return f"{html.escape(target.name)} is not paused."
+        target.paused = False
+        scheduler = self.get_scheduler()
+        if scheduler is not None:
+            scheduler.poke_target(target)
+        return f"Resumed {html.escape(target.name)}."
+
+    def set_interval(self, args):
+        target, interval, error = self._find_with_value(args, "interval")
+        if error:
+            return error
+        if not MIN_REMOTE_INTERVAL <= interval <= MAX_REMOTE_INTERVAL:
+            return f"The interval must be between {MIN_REMOTE_INTERVAL:g} and {MAX_REMOTE_INTERVAL:g} seconds."
+        target.poller.set_base_interval(interval)
+        if self.on_update:
+            self.on_update(target)
+        return f"{html.escape(target.name)} is now checked every {interval:g}s."
+
+    def set_threshold(self, args):
+        target, threshold, error = self._find_with_value(args, "threshold")
+        if error:
+            return error
+        if threshold < 0:
+            return "The threshold cannot be negative."
+        target.threshold = threshold
+        if self.on_update:
+            self.on_update(target)
+        return f"Threshold of {html.escape(target.name)} set to {threshold:g}."
+
+    def stats(self, args):
+        if args:
+            target, error = self._find(" ".join(args))
+            if error:
+                return error
+            targets = [target]
+        else:
+            targets = self._targets()
+            if not targets:
+                return "No watch targets."
+        return "\n\n".join(format_stats(target.stats()) for target in targets)
+
+    def snapshot(self, args):
+        target, error = self._find(" ".join(args))
+        if error:
+            return error
+        # A short-lived session: mss handles belong to the thread that opened them
+        with CaptureSession(target.window, target.area, name=target.name) as session:
+            frame = session.grab_frame()
+        if frame is None:
+            return f"Could not capture {html.escape(target.name)}."
+
+        entry = self.snapshots.get(frame)
+        config = self.get_config()
+        caption = f"📸 {html.escape(target.name)} at {datetime.now().strftime('%I:%M:%S %p')}"
+        if entry[1]:
+            try:
+                send_telegram_photo(config, entry[1], caption, timeout=TELEGRAM_TIMEOUT)
+                return None
+            except Exception as e:
+                print(f"Error resending snapshot, uploading it again: {e}")
+        response = send_telegram_photo(config, entry[0], caption, timeout=TELEGRAM_TIMEOUT)
+        entry[1] = photo_file_id(response)
+        return None
+
+    def help(self, args):
+        return "Available commands:\n" + "\n".join(self.extra_help + COMMAND_HELP)
+
+def format_stats(stats):
+    """Format one target's stats() for a Telegram message."""
+    last_change = stats['last_change'].strftime("%I:%M:%S %p") if stats['last_change'] else "never"
+    return (f"<b>{html.escape(stats['name'])}</b> - {stats['status']}\n"
+            f"Ticks/sec: {stats['fps']:.2f} (every {stats['interval']:.1f}s)\n"
+            f"Last change: {last_change} ({stats['change_percent']:.2f}%)\n"
+            f"Diff latency: {stats['diff_ms']:.1f} ms, {stats['skip_rate'] * 100:.0f}% skipped\n"
+            f"Ticks: {stats['ticks']}, changes: {stats['changes']}, suppressed: {stats['suppressed']}, "
+            f"failures: {stats['failures']}\n"
+            f"Threshold: {stats['threshold']:g}")
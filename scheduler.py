@@ -0,0 +1,464 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import mss
+from capture import GEOMETRY_REFRESH_INTERVAL, FrameRing, window_geometry, area_region, screenshot_to_bgra
+from clips import CLIP_GIF, ClipRecorder
+from diff_engine import (TILE_SIZE, MIN_TILE_SIZE, CHANGE_THRESHOLD, COMPARE_RGB, FramePreparer, detect_changes,
+                         change_regions)
+from fingerprint import FramePrefilter
+from masks import IgnoreMask, NoiseLearner, window_to_frame, frame_to_window
+from metrics import metrics
+from noise_model import TileNoiseModel
+from process_pool import ProcessDiffPool, new_generation
+from notifications import AlertCooldown
+from polling import MAX_POLL_INTERVAL, AdaptivePoller
+
+# Longest the scheduler thread sleeps before re-checking targets (seconds)
+MAX_IDLE_WAIT = 0.5
+# Saved settings a running target picks up in place; changing any other one rebuilds the target
+LIVE_SETTINGS = ("interval", "max_interval", "threshold", "min_change_percent")
+
+class WatchTarget:
+    """One window (or area of a window) watched by the MonitorScheduler.
+
+    process_frame() times its prefilter, diff and regions stages into the
+    metrics, labelled with the target's name.
+    """
+
+    def __init__(self, name, window, area=None, interval=1.0,
+                 threshold=CHANGE_THRESHOLD, tile_size=TILE_SIZE,
+                 max_interval=MAX_POLL_INTERVAL, min_change_percent=0, perceptual=False,
+                 min_tile_size=MIN_TILE_SIZE, ignore=None, learn_frames=0, adaptive=False,
+                 compare_mode=COMPARE_RGB, clip_frames=0, clip_format=CLIP_GIF):
+        self.name = name
+        self.window = window
+        self.area = area
+        self.threshold = threshold
+        self.min_change_percent = min_change_percent
+        self.tile_size = tile_size
+        self.min_tile_size = min_tile_size
+        self.poller = AdaptivePoller(interval, max_interval)
+        self.cooldown = AlertCooldown()
+        # Fingerprints, masks and noise bands all work on the prepared (compared) frame
+        self.preparer = FramePreparer(compare_mode)
+        self.prefilter = FramePrefilter(self.preparer.tile_size(tile_size), perceptual)
+        # Ignored rectangles are kept in window coordinates, like area
+        self.ignore = [tuple(rect) for rect in ignore or []]
+        self.mask = IgnoreMask(self.preparer.to_prepared(window_to_frame(self.ignore, area)))
+        self.learner = NoiseLearner(learn_frames, min_tile_size, threshold) if learn_frames else None
+        self.noise = TileNoiseModel(self.preparer.tile_size(tile_size)) if adaptive else None
+        self.diff_pool = None  # Set by a MonitorScheduler running in process mode
+        self.frames = FrameRing()  # Contiguous copies of the scheduler's grabs
+        # The last frames before and after each change, saved as a clip
+        self.clip_format = clip_format
+        self.clips = ClipRecorder(name, clip_frames, clip_frames, clip_format=clip_format) if clip_frames else None
+
+        self.paused = False
+        self.busy = False
+        self.baseline = None
+        self.generation = None  # Identifies the baseline's pixels to the diff pool
+        self.status = "Waiting"
+        self.region = None
+        self._geometry_time = 0
+
+        # Statistics shown in the GUI
+        self.ticks = 0
+        self.changes = 0
+        self.failures = 0
+        self.last_change = None
+        self.last_diff_time = 0.0
+        self.last_change_percent = 0.0
+
+    @property
+    def interval(self):
+        """Current (adapted) polling interval in seconds."""
+        return self.poller.interval
+
+    @property
+    def next_due(self):
+        return self.poller.deadline if self.poller.deadline is not None else 0.0
+
+    def screen_region(self, now):
+        """Return the screen rectangle to capture, re-reading geometry only periodically."""
+        if self.region is None or now - self._geometry_time >= GEOMETRY_REFRESH_INTERVAL:
+            with metrics.timer("stage_seconds", target=self.name, stage="geometry"):
+                left, top, width, height = window_geometry(self.window)
+            monitor = {"left": left, "top": top, "width": width, "height": height}
+            self.region = area_region(monitor, self.area) if self.area else monitor
+            self._geometry_time = now
+        return self.region
+
+    def capture_failed(self):
+        """Record a failed grab and force a geometry lookup on the next tick."""
+        self.failures += 1
+        metrics.inc("capture_failures_total", target=self.name)
+        self.region = None
+        self.status = "Capture failed"
+
+    def process_frame(self, frame):
+        """Compare a frame against the baseline, returning a change event dict or None."""
+        started = time.perf_counter()
+        event = None
+        generations = (self.generation, new_generation())
+        # Fingerprint the raw grab first; identical frames skip the conversion and the diff entirely
+        baseline = prepared = candidates = None
+        if self.prefilter.identical(frame):
+            self.preparer.reuse(self.baseline, frame)
+        else:
+            # The baseline is converted first; it is usually the previous frame and already prepared
+            baseline = self.preparer.prepare(self.baseline) if self.baseline is not None else None
+            prepared = self.preparer.prepare(frame)
+            candidates = self.prefilter.candidates(prepared)
+        checked = time.perf_counter()
+        metrics.observe("stage_seconds", checked - started, target=self.name, stage="prefilter")
+        if self.learner is not None:
+            # Learn the noisy cells before any change is reported
+            self.status = "Learning"
+            if self.learner.update(frame):
+                self.ignore_rects(frame_to_window(self.learner.rects(), self.area))
+                self.learner = None
+        elif self.baseline is None or self.baseline.shape != frame.shape:
+            self.status = "Watching"
+        elif candidates is None:
+            if self.noise is not None:
+                self.noise.skip()
+            self.status = "Watching"
+            metrics.inc("frames_skipped_total", target=self.name)
+        else:
+            boxes, percent = self._compare(baseline, prepared, candidates, generations)
+            compared = time.perf_counter()
+            metrics.observe("stage_seconds", compared - checked, target=self.name, stage="diff")
+            if boxes:
+                # Merge adjacent cells so one changed area is reported once
+                cell_size = self.preparer.tile_size(min(self.min_tile_size, self.tile_size))
+                regions = self.preparer.regions_to_frame(change_regions(baseline, prepared, boxes, cell_size),
+                                                         frame.shape[1], frame.shape[0])
+                metrics.observe("stage_seconds", time.perf_counter() - compared, target=self.name,
+                                stage="regions")
+                metrics.inc("changes_total", target=self.name)
+                self.changes += 1
+                self.last_change = datetime.now()
+                # Only the share of an alerted change is counted exactly, and it goes with last_change
+                self.last_change_percent = percent
+                self.status = "Changed"
+                event = {
+                    "target": self.name,
+                    "time": self.last_change,
+                    "boxes": [region["box"] for region in regions],
+                    "regions": regions,
+                    "percent": self.last_change_percent,
+                    # Events outlive the tick (notification queue); the frame buffer is reused
+                    "frame": frame.copy()
+                }
+            else:
+                self.status = "Watching"
+        if self.clips is not None:
+            self.clips.add(frame)
+            if event is not None:
+                self.clips.mark(event["boxes"], event["time"])
+        self.baseline, self.generation = frame, generations[1]
+        self.poller.record(event is not None)
+        self.ticks += 1
+        self.last_diff_time = time.perf_counter() - started
+        metrics.inc("ticks_total", target=self.name)
+        return event
+
+    def _compare(self, baseline, frame, candidates, generations):
+        # Sizes are scaled to the prepared frames; the boxes come back in their coordinates
+        tile_size = self.preparer.tile_size(self.tile_size)
+        min_tile_size = self.preparer.tile_size(self.min_tile_size)
+        if self.diff_pool is not None:
+            # The worker scores the tiles against the band; the model learns from them here
+            band = self.noise.band() if self.noise is not None and not self.noise.warming_up else None
+            boxes, percent, scores = self.diff_pool.detect(self.name, baseline, frame, tile_size,
+                                                           self.threshold, self.min_change_percent, candidates,
+                                                           min_tile_size, self.mask.rects, band,
+                                                           self.noise is not None, generations)
+            if scores is not None:
+                self.noise.observe(scores)
+            return boxes, percent
+
+        # Tiles must also leave their own learned noise band once warmed up
+        firing = self.noise.check(baseline, frame) if self.noise is not None else None
+        if firing is not None:
+            candidates = candidates & firing
+        return detect_changes(baseline, frame, tile_size, self.threshold, self.min_change_percent,
+                              candidates, min_tile_size, self.mask)
+
+    def ignore_rects(self, rects):
+        """Exclude more window-relative rectangles from the comparison."""
+        rects = [tuple(rect) for rect in rects]
+        self.ignore.extend(rects)
+        self.mask.add(self.preparer.to_prepared(window_to_frame(rects, self.area)))
+
+    def settings(self):
+        """Return the target's settings in the form they are saved in."""
+        return {
+            "name": self.name,
+            "window_title": self.window.title,
+            "area": list(self.area) if self.area else None,
+            "interval": self.poller.base_interval,
+            "max_interval": self.poller.max_interval,
+            "threshold": self.threshold,
+            "min_change_percent": self.min_change_percent,
+            "perceptual": self.prefilter.perceptual,
+            "min_tile_size": self.min_tile_size,
+            "ignore": [list(rect) for rect in self.ignore],
+            "adaptive": self.noise is not None,
+            "compare_mode": self.preparer.mode,
+            "clip_frames": self.clips.pre if self.clips else 0,
+            "clip_format": self.clip_format
+        }
+
+    def update_settings(self, spec):
+        """Apply saved settings in place; returns False if they need a new target instead."""
+        current = self.settings()
+        for key, value in spec.items():
+            if key not in LIVE_SETTINGS and key in current and value != current[key]:
+                return False
+        if spec.get("interval", current["interval"]) != current["interval"]:
+            self.poller.set_base_interval(spec["interval"])
+        self.poller.max_interval = max(self.poller.base_interval, spec.get("max_interval", current["max_interval"]))
+        self.threshold = spec.get("threshold", self.threshold)
+        self.min_change_percent = spec.get("min_change_percent", self.min_change_percent)
+        return True
+
+    def stats(self):
+        """Return a snapshot of the target's state and statistics."""
+        return {
+            "name": self.name,
+            "status": "Paused" if self.paused else self.status,
+            "interval": self.interval,
+            "fps": self.poller.fps,
+            "threshold": self.threshold,
+            "min_change_percent": self.min_change_percent,
+            "change_percent": self.last_change_percent,
+            "ticks": self.ticks,
+            "changes": self.changes,
+            "suppressed": self.cooldown.suppressed,
+            "failures": self.failures,
+            "last_change": self.last_change,
+            "diff_ms": self.last_diff_time * 1000,
+            "skip_rate": self.prefilter.stats()["frame_skip_rate"]
+        }
+
+def _overlaps(a, b):
+    return (a["left"] < b["left"] + b["width"] and b["left"] < a["left"] + a["width"] and
+            a["top"] < b["top"] + b["height"] and b["top"] < a["top"] + a["height"])
+
+def _union(a, b):
+    left = min(a["left"], b["left"])
+    top = min(a["top"], b["top"])
+    right = max(a["left"] + a["width"], b["left"] + b["width"])
+    bottom = max(a["top"] + a["height"], b["top"] + b["height"])
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+def _monitor_index(region, monitors):
+    cx = region["left"] + region["width"] // 2
+    cy = region["top"] + region["height"] // 2
+    for index, mon in enumerate(monitors):
+        if mon["left"] <= cx < mon["left"] + mon["width"] and mon["top"] <= cy < mon["top"] + mon["height"]:
+            return index
+    return -1
+
+def group_regions(items, monitors):
+    """Batch overlapping capture rectangles into shared grabs.
+
+    items is a list of (key, region) pairs. Regions on the same monitor that
+    overlap are merged into one grab as long as the merged rectangle is no
+    larger than the regions it replaces. Returns a list of (region, keys).
+    """
+    groups = []
+    for key, region in items:
+        index = _monitor_index(region, monitors)
+        area = region["width"] * region["height"]
+        for group in groups:
+            if group["monitor"] != index or not _overlaps(group["region"], region):
+                continue
+            merged = _union(group["region"], region)
+            if merged["width"] * merged["height"] <= group["area"] + area:
+                group["region"] = merged
+                group["area"] += area
+                group["keys"].append(key)
+                break
+        else:
+            groups.append({"monitor": index, "region": dict(region), "area": area, "keys": [key]})
+    return [(group["region"], group["keys"]) for group in groups]
+
+class MonitorScheduler:
+    """Run many WatchTargets from one capture thread and a pool of diff workers.
+
+    The capture thread owns the mss handle, grabs every due target (sharing
+    one grab between overlapping targets on the same monitor) and hands each
+    frame to the worker pool for comparison. on_change(target, event) is
+    called from a worker thread whenever a target changes. With processes
+    set, the worker threads hand the pixel work to a ProcessDiffPool so
+    comparisons use every core instead of sharing the GIL.
+
+    Each tick is timed from the grab to the end of the comparison; ticks
+    that take longer than the target's base interval are counted as over
+    budget. The number of comparisons in flight is exported as a gauge.
+    """
+
+    def __init__(self, on_change=None, workers=None, processes=0):
+        self.on_change = on_change
+        self.diff_pool = None
+        if processes:
+            self.diff_pool = ProcessDiffPool(processes)
+        self.targets = []
+        self.running = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                        thread_name_prefix="diff-worker")
+        metrics.gauge_callback("diff_queue_depth", lambda: sum(target.busy for target in self.targets))
+
+    def add_target(self, target):
+        target.diff_pool = self.diff_pool
+        with self._lock:
+            self.targets.append(target)
+        self._wake.set()
+
+    def remove_target(self, target):
+        with self._lock:
+            if target in self.targets:
+                self.targets.remove(target)
+        if self.diff_pool is not None and not target.busy:
+            self.diff_pool.release(target.name)
+        if target.clips is not None:
+            target.clips.close()
+
+    def poke_target(self, target):
+        """Check a target right away and reset it to its base interval."""
+        target.poller.poke()
+        self._wake.set()
+
+    def sync_targets(self, specs, build):
+        """Make the targets match a list of saved settings (e.g. after the file was edited).
+
+        Targets whose only changes are LIVE_SETTINGS keep running with their
+        statistics; others are replaced by build(spec), which returns a new
+        WatchTarget or None if it cannot be created.
+        """
+        wanted = {spec["name"]: spec for spec in specs}
+        with self._lock:
+            targets = list(self.targets)
+        for target in targets:
+            spec = wanted.pop(target.name, None)
+            if spec is not None and target.update_settings(spec):
+                continue
+            self.remove_target(target)
+            if spec is not None:
+                wanted[target.name] = spec
+        for spec in wanted.values():
+            target = build(spec)
+            if target is not None:
+                self.add_target(target)
+
+    def get_target(self, name):
+        with self._lock:
+            for target in self.targets:
+                if target.name == name:
+                    return target
+        return None
+
+    def start(self):
+        """Start the capture thread if it is not already running."""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the capture thread; in-flight comparisons are allowed to finish."""
+        self.running = False
+        self._wake.set()
+
+    def close(self):
+        """Stop the scheduler, save pending clips and shut down its worker processes."""
+        self.stop()
+        with self._lock:
+            targets = list(self.targets)
+        for target in targets:
+            if target.clips is not None:
+                target.clips.close()
+        if self.diff_pool is not None:
+            self.diff_pool.close()
+
+    def _run(self):
+        try:
+            with mss.mss() as sct:
+                monitors = sct.monitors[1:]
+                while self.running:
+                    now = time.monotonic()
+                    with self._lock:
+                        active = [t for t in self.targets if not t.paused]
+                    due = [t for t in active if not t.busy and t.next_due <= now]
+                    if due:
+                        self._capture(sct, monitors, due, now)
+
+                    # Sleep until the next target is due (or something wakes us)
+                    pending = [t.next_due for t in active if not t.busy]
+                    wait = min(pending) - time.monotonic() if pending else MAX_IDLE_WAIT
+                    self._wake.wait(min(max(wait, 0), MAX_IDLE_WAIT))
+                    self._wake.clear()
+        except Exception as e:
+            print(f"Capture thread error: {e}")
+            self.running = False
+
+    def _capture(self, sct, monitors, due, now):
+        items = []
+        for target in due:
+            target.poller.tick(now)
+            try:
+                region = target.screen_region(now)
+                if region["width"] > 0 and region["height"] > 0:
+                    items.append((target, region))
+            except Exception as e:
+                print(f"Error reading geometry for {target.name}: {e}")
+                target.capture_failed()
+
+        for group_region, targets in group_regions(items, monitors):
+            started = time.perf_counter()
+            try:
+                bgra = screenshot_to_bgra(sct.grab(group_region))
+            except Exception as e:
+                print(f"Screenshot capture error: {e}")
+                for target in targets:
+                    target.capture_failed()
+                continue
+            grabbed = time.perf_counter() - started
+
+            for target in targets:
+                # A grab shared by overlapping targets counts towards each of them
+                metrics.observe("stage_seconds", grabbed, target=target.name, stage="grab")
+                region = target.region
+                top = region["top"] - group_region["top"]
+                left = region["left"] - group_region["left"]
+                target.busy = True
+                self._pool.submit(self._process, target,
+                                  bgra[top:top + region["height"], left:left + region["width"]], started)
+
+    def _process(self, target, bgra, started):
+        try:
+            # Copied out of the shared grab here, off the capture thread; diffs are much faster on
+            # a contiguous RGB frame than on a strided view of the BGRA buffer
+            with metrics.timer("stage_seconds", target=target.name, stage="convert"):
+                frame = target.frames.store_bgra(bgra)
+            event = target.process_frame(frame)
+            elapsed = time.perf_counter() - started
+            metrics.observe("tick_seconds", elapsed, target=target.name)
+            if elapsed > target.poller.base_interval:
+                metrics.inc("ticks_over_budget_total", target=target.name)
+            if event and self.on_change:
+                self.on_change(target, event)
+        except Exception as e:
+            print(f"Error comparing frames for {target.name}: {e}")
+        finally:
+            target.busy = False
+            self._wake.set()
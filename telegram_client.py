@@ -0,0 +1,228 @@
+import io
+import html
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+from config_store import store
+from metrics import metrics
+from diff_engine import describe_regions
+
+# Seconds to wait for a Telegram API call before giving up
+TELEGRAM_TIMEOUT = 10
+# Keep-alive connections kept open to api.telegram.org
+TELEGRAM_POOL_SIZE = 4
+# Seconds getUpdates waits on the server for a new message
+TELEGRAM_POLL_TIMEOUT = 30
+# Longest pause (seconds) between getUpdates retries after errors
+TELEGRAM_MAX_RETRY_DELAY = 30
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the shared keep-alive HTTP session used for every Telegram call."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_POOL_SIZE)
+            _session.mount("https://", adapter)
+        return _session
+
+def telegram_request(config, method, timeout=TELEGRAM_TIMEOUT, **kwargs):
+    """Call a Telegram Bot API method over the shared session and return the response.
+
+    The round trip is timed into the metrics per method; failed calls and
+    non-200 answers are counted as errors.
+    """
+    url = f"https://api.telegram.org/bot{config['bot_token']}/{method}"
+    started = time.perf_counter()
+    try:
+        if 'params' in kwargs:
+            response = get_session().get(url, timeout=timeout, **kwargs)
+        else:
+            response = get_session().post(url, timeout=timeout, **kwargs)
+    except Exception:
+        metrics.inc("telegram_errors_total", method=method)
+        raise
+    finally:
+        metrics.observe("telegram_request_seconds", time.perf_counter() - started, method=method)
+    if response.status_code != 200:
+        metrics.inc("telegram_errors_total", method=method)
+    return response
+
+def encode_png(image):
+    """Encode a PIL image as PNG into an in-memory buffer ready for upload."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+def load_telegram_config():
+    """Return the cached Telegram configuration, or None if it is not set up."""
+    return store.get('telegram')
+
+def send_telegram_message(message, config=None, timeout=TELEGRAM_TIMEOUT):
+    """Send a simple text message via Telegram."""
+    config = config or load_telegram_config()
+    if not config:
+        return
+
+    try:
+        response = telegram_request(config, "sendMessage", timeout=timeout, data={
+            "chat_id": config['chat_id'],
+            "text": message,
+            "parse_mode": "HTML"
+        })
+        if response.status_code != 200:
+            print(f"Failed to send Telegram message: {response.text}")
+    except Exception as e:
+        print(f"Error sending Telegram message: {e}")
+
+def send_telegram_photo(config, photo, caption, timeout=TELEGRAM_TIMEOUT):
+    """Send a photo with a caption. Raises on errors.
+
+    photo is a PIL image or already-encoded PNG bytes (uploaded), or the
+    file_id of a photo Telegram already has (sent without an upload).
+    """
+    data = {
+        "chat_id": config['chat_id'],
+        "caption": caption,
+        "parse_mode": "HTML"
+    }
+    if isinstance(photo, str):
+        response = telegram_request(config, "sendPhoto", timeout=timeout, data={**data, "photo": photo})
+    else:
+        upload = photo if isinstance(photo, bytes) else encode_png(photo)
+        response = telegram_request(config, "sendPhoto", timeout=timeout, data=data, files={
+            "photo": ("screenshot.png", upload, "image/png")
+        })
+    response.raise_for_status()
+    return response
+
+def photo_file_id(response):
+    """Return the file_id of the largest size of a photo sendPhoto answered with, or None."""
+    try:
+        return response.json()["result"]["photo"][-1]["file_id"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+def send_change_notification(config, overlay_image=None, target_name=None, timeout=TELEGRAM_TIMEOUT,
+                             regions=None):
+    """Send the change alert as one captioned screenshot. Raises on network or API errors."""
+    # Get current time
+    current_time = datetime.now().strftime("%I:%M:%S %p")
+
+    # Captions are sent as HTML; window titles like "Q&A" would otherwise be rejected
+    source = f"'{html.escape(target_name)}'" if target_name else "monitored browser window"
+    message_text = f"🔔 Change detected in {source}!\n⏰ Time: {current_time}"
+    if regions:
+        message_text += f"\n📐 {describe_regions(regions)}"
+
+    # Without an image fall back to a plain text message
+    if not overlay_image:
+        response = telegram_request(config, "sendMessage", timeout=timeout, data={
+            "chat_id": config['chat_id'],
+            "text": message_text,
+            "parse_mode": "HTML"
+        })
+        response.raise_for_status()
+        return
+
+    caption = f"{message_text}\nChanged areas are highlighted in red."
+    send_telegram_photo(config, overlay_image, caption, timeout=timeout)
+
+class TelegramCommandListener:
+    """Long-poll getUpdates on a thread and hand each command over as it arrives.
+
+    handler(command) is called on the listener thread with the stripped
+    text of every message from the configured chat, straight after the
+    batch arrives. The next getUpdates is sent at once, so the only wait is
+    the server-side long poll. The update offset is saved in the
+    telegram_state section before the commands are handled, so a restart
+    never replays them. On the very first run (no saved offset) pending
+    updates are skipped instead of replaying old commands. Errors back off
+    exponentially up to TELEGRAM_MAX_RETRY_DELAY seconds. get_config()
+    returns the Telegram configuration to poll with (the stored one by
+    default).
+    """
+
+    def __init__(self, handler, poll_timeout=TELEGRAM_POLL_TIMEOUT, get_config=load_telegram_config):
+        self.handler = handler
+        self.poll_timeout = poll_timeout
+        self.get_config = get_config
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        """Start listening unless already running."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop after the current long poll returns (the thread is a daemon, so exit never waits)."""
+        self._stop.set()
+
+    def _get_updates(self, config, offset, timeout):
+        params = {"timeout": timeout}
+        if offset is not None:
+            params["offset"] = offset
+        response = telegram_request(config, "getUpdates", params=params, timeout=timeout + TELEGRAM_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("ok"):
+            raise RuntimeError(data.get("description", "getUpdates failed"))
+        return data.get("result", [])
+
+    def _save_offset(self, offset):
+        store.save('telegram_state', {**store.get('telegram_state'), 'update_offset': offset})
+
+    def _run(self):
+        delay = 1
+        offset = store.get('telegram_state')['update_offset']
+        while not self._stop.is_set():
+            # Pick up edits to the (cached) config without re-reading the file
+            config = self.get_config()
+            if not config:
+                self._stop.wait(TELEGRAM_MAX_RETRY_DELAY)
+                continue
+            try:
+                if offset is None:
+                    # First run: skip whatever was sent before the listener existed
+                    latest = self._get_updates(config, -1, 0)
+                    offset = latest[-1]["update_id"] + 1 if latest else 0
+                    self._save_offset(offset)
+                    continue
+
+                updates = self._get_updates(config, offset, self.poll_timeout)
+                delay = 1
+            except Exception as e:
+                print(f"Error checking Telegram commands: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, TELEGRAM_MAX_RETRY_DELAY)
+                continue
+
+            if not updates:
+                continue
+            offset = updates[-1]["update_id"] + 1
+            self._save_offset(offset)
+            for update in updates:
+                message = update.get("message") or {}
+                if "text" not in message:
+                    continue
+                # Only the configured chat may control the monitor
+                if str(message.get("chat", {}).get("id")) != str(config.get("chat_id")):
+                    continue
+                try:
+                    self.handler(message["text"].strip())
+                except Exception as e:
+                    print(f"Error handling Telegram command: {e}")
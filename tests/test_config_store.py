@@ -0,0 +1,17 @@
+import json
+from config_store import DEFAULT_ALERT_SETTINGS, ConfigFile, validate_alert_settings, validate_watch_targets
+
+def test_invalid_alert_settings_fall_back_to_defaults():
+    settings = validate_alert_settings({**DEFAULT_ALERT_SETTINGS, 'compare_mode': 'bogus', 'cooldown_period': -1,
+                                        'clip_format': 'avi', 'min_change_percent': 2.5})
+    assert settings['compare_mode'] == DEFAULT_ALERT_SETTINGS['compare_mode']
+    assert settings['cooldown_period'] == DEFAULT_ALERT_SETTINGS['cooldown_period']
+    assert settings['clip_format'] == DEFAULT_ALERT_SETTINGS['clip_format']
+    assert settings['min_change_percent'] == 2.5
+
+def test_reload_drops_invalid_watch_targets(tmp_path):
+    path = tmp_path / "targets.json"
+    good = {'name': 'a', 'window_title': 'w', 'interval': 1, 'max_interval': 10, 'threshold': 10}
+    path.write_text(json.dumps({'targets': [good, {**good, 'name': 'b', 'compare_mode': 'bogus'}, {'name': 'c'}]}))
+    config_file = ConfigFile(str(path), {'targets': []}, validate_watch_targets)
+    assert config_file.get()['targets'] == [good]
@@ -0,0 +1,59 @@
+import numpy as np
+from diff_engine import detect_changes, find_changed_tiles, label_regions, localize_changes
+
+def make_frames(width=400, height=300):
+    before = np.zeros((height, width, 3), dtype=np.uint8)
+    return before, before.copy()
+
+def test_refinement_keeps_the_tile_mean_gate():
+    before, after = make_frames()
+    # A few changed pixels stay under a tile's mean threshold, as with whole tiles
+    after[150:156, 250:256] = 255
+    assert detect_changes(before, after)[0] == []
+    assert detect_changes(before, after, min_tile_size=20)[0] == []
+
+def test_refined_boxes_lie_inside_the_changed_tiles():
+    before, after = make_frames()
+    after[10:50, 110:150] = 255
+    _, tiles = find_changed_tiles(before, after)
+    boxes, percent = localize_changes(before, after)
+    assert tiles == [(100, 0, 200, 100)]
+    assert boxes == [(left, top, left + 20, top + 20) for top in (0, 20, 40) for left in (100, 120, 140)]
+    assert percent > 0
+
+def test_label_regions_joins_boxes_off_the_cell_grid():
+    # Whole 25px tiles labelled on a 7px grid, and boxes on a 30px grid that 100 does not divide
+    assert len(label_regions([(0, 0, 25, 25), (25, 0, 50, 25), (50, 25, 75, 50)], 7)) == 1
+    assert len(label_regions([(90, 0, 100, 30), (100, 0, 130, 30)], 30)) == 1
+    assert len(label_regions([(0, 0, 30, 30), (31, 0, 60, 30)], 30)) == 2
+
+def test_reported_percent_covers_the_whole_frame():
+    before, after = make_frames()
+    # Changes far apart, so the first changed band of rows is not all of it
+    after[0:30, 0:100] = 255
+    after[250:300, 300:400] = 255
+    for min_tile_size in (None, 20):
+        boxes, percent = detect_changes(before, after, min_tile_size=min_tile_size)
+        assert boxes
+        assert percent == 8000 * 100 / (400 * 300)
+
+def test_coarse_level_sees_pixels_between_its_samples():
+    before, after = make_frames()
+    # Changed columns 1-3 of every 4, which sampling every 4th pixel would skip
+    for offset in (1, 2, 3):
+        after[:100, 100 + offset:200:4] = 255
+    _, tiles = find_changed_tiles(before, after)
+    assert tiles == [(100, 0, 200, 100)]
+    boxes, _ = detect_changes(before, after, min_tile_size=20)
+    assert {(left // 100 * 100, top // 100 * 100) for left, top, _, _ in boxes} == {(100, 0)}
+
+def test_coarse_level_does_not_cancel_out_a_change():
+    before, after = make_frames()
+    # Swapping a checkerboard keeps the average of every block the same
+    before[:100, :100][::2, ::2] = before[:100, :100][1::2, 1::2] = 200
+    after[:100, :100][1::2, ::2] = after[:100, :100][::2, 1::2] = 200
+    after[:100, :100][::2, ::2] = after[:100, :100][1::2, 1::2] = 0
+    _, tiles = find_changed_tiles(before, after)
+    assert tiles == [(0, 0, 100, 100)]
+    boxes, _ = detect_changes(before, after, min_tile_size=20)
+    assert len(boxes) == 25
@@ -0,0 +1,22 @@
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from history import ChangeHistory, HistoryRecorder, history_dir
+
+def test_events_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    writers = []
+    record = ChangeHistory.record
+    monkeypatch.setattr(ChangeHistory, "record",
+                        lambda self, *args: writers.append(threading.current_thread()) or record(self, *args))
+    recorder = HistoryRecorder(str(tmp_path))
+    start = datetime(2026, 1, 1)
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    for index in range(3):
+        frame[:10, :10 * (index + 1)] = 255
+        recorder.record_event({"target": "page", "frame": frame.copy(), "time": start + timedelta(seconds=index)})
+    recorder.close()
+
+    assert writers and threading.current_thread() not in writers
+    history = ChangeHistory(history_dir(str(tmp_path), "page"))
+    assert len(history.records) == 3
+    assert (history.frame(2) == frame).all()
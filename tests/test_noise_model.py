@@ -0,0 +1,30 @@
+import numpy as np
+from noise_model import TileNoiseModel
+
+def warmed_up_model():
+    model = TileNoiseModel(warmup=5)
+    for value in (1.0, 1.2, 0.8, 1.0, 1.0):
+        assert model.observe(np.full((2, 2), value)) is None
+    return model
+
+def test_a_change_barely_widens_its_band():
+    model = warmed_up_model()
+    band = model.band().copy()
+    firing = model.observe(np.array([[40.0, 1.0], [1.0, 1.0]]))
+    assert firing.tolist() == [[True, False], [False, False]]
+    assert model.band()[0, 0] < 2 * band[0, 0]
+
+def test_a_tile_that_turns_noisy_stops_firing():
+    model = warmed_up_model()
+    scores = np.random.default_rng(0).uniform(0, 6, (500, 2, 2))
+    scores[:, 1] = 1.0
+    fired = [model.observe(frame)[0, 0] for frame in scores]
+    assert all(fired[:5])
+    assert sum(fired[-200:]) < 10
+
+def test_skipped_frames_count_as_zero_difference():
+    model = warmed_up_model()
+    mean = model.mean.copy()
+    model.skip()
+    assert model.frames == 6
+    assert (model.mean < mean).all()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from diff_engine import MIN_TILE_SIZE, detect_changes
+from masks import IgnoreMask
+from process_pool import ProcessDiffPool, new_generation
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ProcessDiffPool(2)
+    yield pool
+    pool.close()
+
+def make_frames():
+    # Large enough to be split into two stripes
+    before = np.zeros((900, 1200, 3), dtype=np.uint8)
+    after = before.copy()
+    after[320:330, 610:620] = 255  # Too small to move a tile's mean
+    after[100:160, 100:160] = 255
+    after[700:760, 1000:1030] = 200
+    return before, after
+
+@pytest.mark.parametrize("min_tile_size", [100, 20, None])
+@pytest.mark.parametrize("min_percent", [0, 0.5, 5])
+@pytest.mark.parametrize("ignore", [None, [(0, 0, 130, 130)]])
+def test_pool_agrees_with_thread_comparison(pool, min_tile_size, min_percent, ignore):
+    before, after = make_frames()
+    boxes, percent = detect_changes(before, after, 100, 10, min_percent, None, min_tile_size,
+                                    IgnoreMask(ignore or []))
+    pool_boxes, pool_percent, _ = pool.detect("test", before, after, 100, 10, min_percent, None,
+                                              min_tile_size, ignore)
+    assert sorted(pool_boxes) == sorted(boxes)
+    assert pool_percent == pytest.approx(percent)
+
+def test_refilled_buffer_is_not_taken_for_the_shared_copy(pool):
+    # Two capture buffers that are refilled in turn, as a FrameRing does
+    first, second = make_frames()
+    generations = [new_generation() for _ in range(4)]
+    assert pool.detect("ring", first, second, generations=(generations[0], generations[1]))[0]
+
+    # The perceptual prefilter skipped a tick; the second buffer now holds the first frame's pixels
+    second[:] = first
+    assert pool.detect("ring", second, first, generations=(generations[2], generations[3]))[0] == []
+    assert pool.detect("ring", first, second)[0] == []
+
+def test_baseline_written_last_is_reused(pool):
+    before, after = make_frames()
+    generations = [new_generation() for _ in range(3)]
+    pool.detect("reuse", before, after, generations=(generations[0], generations[1]))
+    boxes, percent, _ = pool.detect("reuse", after, before, generations=(generations[1], generations[2]))
+    assert boxes == detect_changes(after, before, 100, 10, 0, None, MIN_TILE_SIZE)[0]
@@ -0,0 +1,19 @@
+import numpy as np
+from diff_engine import COMPARE_LUMA_4X, FramePreparer
+from scheduler import WatchTarget
+
+def test_identical_grabs_are_not_converted(monkeypatch):
+    prepared = []
+    prepare = FramePreparer.prepare
+    monkeypatch.setattr(FramePreparer, "prepare", lambda self, frame: prepared.append(frame) or prepare(self, frame))
+    target = WatchTarget("page", window=None, compare_mode=COMPARE_LUMA_4X)
+    frame = np.zeros((200, 300, 3), dtype=np.uint8)
+    target.process_frame(frame)
+    for _ in range(3):
+        assert target.process_frame(frame.copy()) is None
+    assert len(prepared) == 1
+
+    changed = frame.copy()
+    changed[:100, :100] = 255
+    assert target.process_frame(changed) is not None
+    assert target.status == "Changed"
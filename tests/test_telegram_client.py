@@ -0,0 +1,18 @@
+import telegram_client
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+def test_change_notification_escapes_target_name(monkeypatch):
+    calls = []
+    monkeypatch.setattr(telegram_client, "telegram_request",
+                        lambda config, method, **kwargs: calls.append(kwargs["data"]) or FakeResponse())
+
+    telegram_client.send_change_notification({"chat_id": 1, "bot_token": "x"}, None, "Q&A <b>Stack</b>")
+
+    text = calls[0]["text"]
+    assert "'Q&amp;A &lt;b&gt;Stack&lt;/b&gt;'" in text
+    assert calls[0]["parse_mode"] == "HTML"